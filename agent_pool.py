@@ -0,0 +1,113 @@
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+from deadlines import on_abandoned
+
+
+class PoolSaturated(Exception):
+    """Raised when every agent worker is busy and the queue is full"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Agent pool is saturated")
+        self.retry_after = retry_after
+
+
+class AgentPool:
+    """Bounded thread pool for blocking Portia runs.
+
+    At most `max_workers` runs execute at once and at most `max_queue` more wait
+    for a worker; anything beyond that is rejected straight away with
+    PoolSaturated so the event loop stays free for health checks and cache hits.
+    Steps abandoned at their deadline (deadlines.py) keep their threads until they
+    finish, so a run that left any behind still holds its slot until the last of
+    them is done.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, retry_after: int = 10):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent")
+        self._lock = threading.Lock()
+        self._counters = {"submitted": 0, "rejected": 0, "in_use": 0, "abandoned": 0}
+
+    @classmethod
+    def from_env(cls) -> "AgentPool":
+        return cls(
+            max_workers=int(os.getenv("AGENT_POOL_WORKERS", "4")),
+            max_queue=int(os.getenv("AGENT_POOL_QUEUE", "16")),
+            retry_after=int(os.getenv("AGENT_POOL_RETRY_AFTER", "10")),
+        )
+
+    def _release(self, _future: Future) -> None:
+        with self._lock:
+            self._counters["in_use"] -= 1
+
+    def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        # Abandoned steps still running for this run; the run counts as abandoned while any are
+        leftover = [0]
+
+        def step_finished(_future: Future) -> None:
+            with self._lock:
+                leftover[0] -= 1
+                if leftover[0] == 0:
+                    self._counters["abandoned"] -= 1
+
+        def step_abandoned(future: Future) -> None:
+            with self._lock:
+                if leftover[0] == 0:
+                    self._counters["abandoned"] += 1
+                leftover[0] += 1
+            future.add_done_callback(step_finished)
+
+        on_abandoned(step_abandoned)
+        return fn(*args)
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        with self._lock:
+            if self._counters["in_use"] + self._counters["abandoned"] >= self.max_workers + self.max_queue:
+                self._counters["rejected"] += 1
+                raise PoolSaturated(self.retry_after)
+            self._counters["submitted"] += 1
+            self._counters["in_use"] += 1
+        try:
+            # Carry the caller's context (request id) into the worker thread
+            future = self._executor.submit(contextvars.copy_context().run, self._run, fn, *args)
+        except Exception:
+            self._release(None)
+            raise
+        # Release on completion of the run itself, not when an awaiting client goes away
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counters = dict(self._counters)
+        return {
+            **counters,
+            "running": min(counters["in_use"], self.max_workers),
+            "queued": max(counters["in_use"] - self.max_workers, 0),
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+        }
+
+
+async def pool_saturated_handler(request: Request, exc: PoolSaturated) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, please retry shortly"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+agent_pool = AgentPool.from_env()
@@ -1,15 +1,40 @@
 import os
 import asyncio
+import contextvars
+import json
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from functools import partial
+from typing import Any, List, Optional, Tuple
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from portia import Config, LLMProvider, Portia, ToolRegistry, example_tool_registry
+from sse_starlette.sse import EventSourceResponse
 
 # Import your tools
-from tools.pexels_tool import PexelsSearchTool
-from tools.amadeus_tool import AmadeusScheduleTool
+from tools.pexels_tool import image_cache
+from tools.amadeus_tool import offer_cache
+from tools.railradar_tool import availability_cache as rail_availability_cache, \
+    revalidation_cache as rail_revalidation_cache
 from fastapi.middleware.cors import CORSMiddleware
 
+from compare import SORT_ORDERS, compare_modes
+from deadlines import DeadlineExceeded, RequestBudget, call_with_deadline, deadline_context
+from direct import run_direct_searches, search_flights, search_images
+from tools import metrics, resilience
+from tools.image_store import image_store, snap_width
+from tools.locations import AIRPORT, KINDS, airport_code, city_name, location_index
+from tools.response_cache import normalize_query
+from parsing import loads_tolerant
+from app import EXECUTION_MODE_PARALLEL, FANOUT_STEPS, FlightSearchResults, ImageSearchResults, get_agent_context, \
+    run_travel_planning_agent
+from agent_pool import PoolSaturated, agent_pool, pool_saturated_handler
+from itinerary import plan_itinerary
+from guide_cache import FRESH, MISS, STALE, VOLATILE_SECTIONS, guide_cache
+from jobs import job_runner
+from observability import install_metrics
+from singleflight import SingleFlight
+
 load_dotenv()
 
 # FastAPI app
@@ -23,6 +48,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Overflowing the agent pool is answered with 503 + Retry-After
+app.add_exception_handler(PoolSaturated, pool_saturated_handler)
+
+# X-Request-ID on every response, latency histograms and GET /metrics
+install_metrics(app)
+
 # Request body schema
 class TravelRequest(BaseModel):
     source: str
@@ -30,108 +61,578 @@ class TravelRequest(BaseModel):
     journey_date: str
 
 
+def normalize_request(request: TravelRequest) -> TravelRequest:
+    """Resolve free-text places ("bangalore", "Goa, India") to IATA codes so equivalent requests share caches"""
+    return TravelRequest(
+        source=airport_code(request.source),
+        destination=airport_code(request.destination),
+        journey_date=request.journey_date.strip(),
+    )
+
+
+def destination_city(request: TravelRequest) -> str:
+    return city_name(request.destination, AIRPORT)
+
+
+class BatchTravelRequest(BaseModel):
+    requests: List[TravelRequest]
+
+
+class ItineraryRequest(BaseModel):
+    # Legs in travel order, e.g. DEL→GOI, GOI→BLR, BLR→DEL
+    legs: List[TravelRequest]
+
+
 # Health check response model
 class HealthResponse(BaseModel):
     message: str
     status: str
 
 
-# Configure Portia
+# Configure Portia: the same instance, tools and registry the planning agent uses (app.py)
 try:
-    google_config = Config.from_default(
-        llm_provider=LLMProvider.GOOGLE,
-        default_model="google/gemini-2.5-flash",
-        google_api_key=os.getenv("GOOGLE_API_KEY")
-    )
-
-    pexels_tool = PexelsSearchTool(api_key=os.getenv("PEXELS_API_KEY"))
-    flight_tool = AmadeusScheduleTool(
-        api_key=os.getenv("AMADEUS_API_KEY"),
-        api_secret=os.getenv("AMADEUS_API_SECRET")
-    )
-
-    all_custom_tools = [pexels_tool, flight_tool]
-    custom_registry = ToolRegistry(all_custom_tools)
-    combined_registry = example_tool_registry + custom_registry
-
-    portia = Portia(config=google_config, tools=combined_registry)
+    agent_context = get_agent_context()
+    portia = agent_context.portia
+    pexels_tool, flight_tool, rail_tool = agent_context.pexels_tool, agent_context.flight_tool, agent_context.rail_tool
 
 except Exception as e:
     print(f"Error initializing Portia: {e}")
     portia = None
 
+# Concurrent identical /travel-guide requests share one agent run
+travel_guide_flights = SingleFlight()
+
 @app.get("/health")
 async def health_check():
     """Additional health check endpoint"""
-    return {"status": "OK", "message": "Service is running"}
+    return {
+        "status": "OK",
+        "message": "Service is running",
+        "caches": {
+            "pexels_photos": image_cache.stats(),
+            "amadeus_offers": offer_cache.stats(),
+            "railradar_availability": rail_availability_cache.stats(),
+            "railradar_revalidation": rail_revalidation_cache.stats(),
+            "images": image_store.stats(),
+        },
+        "coalescing": travel_guide_flights.stats(),
+        "agent_pool": agent_pool.stats(),
+        "jobs": {**job_runner.store.stats(), "pool": job_runner.pool.stats()},
+        # Rate limiter and circuit breaker state per upstream API
+        "upstreams": resilience.stats(),
+        "locations": len(location_index),
+    }
+
+def run_agent_query(query: str):
+    with metrics.timed(metrics.STEP_DURATION, "step:agent_query", step="agent_query"):
+        return portia.run(query).outputs.final_output.value
 
-@app.post("/travel-guide")
-async def travel_guide(request: TravelRequest):
-    if portia is None:
-        raise HTTPException(status_code=500, detail="Service not properly initialized")
+
+def destination_overview(destination: str, budget: RequestBudget) -> Tuple[dict, Optional[str]]:
+    """Agent-written overview, weather and attractions for a destination, and the error if the run failed"""
+    query = f"""
+    Create a travel guide for {destination} in pure JSON with this exact structure:
+    {{
+      "destination": {{
+        "name": "{destination}",
+        "overview": "string"
+      }},
+      "weather": {{
+        "description": "string",
+        "temperature": "string"
+      }},
+      "attractions": [
+        {{
+          "name": "string",
+          "description": "string"
+        }}
+      ]
+    }}
+
+    Rules:
+    - Always fill `overview` with 3–4 sentences about the destination.
+    - Each attraction must include both `name` and a short `description`.
+    - Do not search for flights or images.
+    """
 
     try:
-        query = f"""
-        Create a detailed travel guide in pure JSON with this exact structure:
+        raw_output = call_with_deadline("overview", budget.timeout_for("llm_tool"), run_agent_query, query)
+    except Exception as e:
+        return {"destination": {"name": destination}}, str(e)
+
+    parsed = loads_tolerant(raw_output)
+    if not isinstance(parsed, dict):
+        parsed = {"text": str(raw_output)}
+    return parsed, None
+
+
+def generate_direct_travel_guide(request: TravelRequest, budget: Optional[RequestBudget] = None) -> dict:
+    """Agent writes only overview, weather and attractions; flights and images come
+    straight from the tools, in parallel with the agent run"""
+    budget = budget or RequestBudget()
+    city = destination_city(request)
+
+    errors = {}
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        searches = executor.submit(
+            contextvars.copy_context().run, run_direct_searches, flight_tool, pexels_tool,
+            request.source, request.destination, request.journey_date, city, budget,
+        )
+        # Flights and images don't depend on the agent, so they are returned even if it fails
+        parsed, overview_error = destination_overview(city, budget)
+        if overview_error:
+            errors["overview"] = overview_error
+        flights, images = searches.result()
+
+    parsed["flights"] = [flight.model_dump() for flight in flights.flights]
+    parsed["images"] = [image.model_dump() for image in images.images]
+    errors.update({name: r.error for name, r in (("flights", flights), ("images", images)) if r.error})
+    if errors:
+        parsed["errors"] = errors
+    return parsed
+
+
+def generate_destination_section(destination: str, budget: RequestBudget) -> dict:
+    """The source-independent part of a direct guide: overview, weather, attractions and images"""
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        images = executor.submit(contextvars.copy_context().run, search_images, pexels_tool, destination)
+        parsed, overview_error = destination_overview(destination, budget)
+        images = images.result()
+
+    errors = {}
+    if overview_error:
+        errors["overview"] = overview_error
+    if images.error:
+        errors["images"] = images.error
+    return {"guide": parsed, "images": [image.model_dump() for image in images.images], "errors": errors}
+
+
+def partial_travel_guide(request: TravelRequest, error: str,
+                         searches: Tuple[FlightSearchResults, ImageSearchResults]) -> dict:
+    """What the tools could still provide when the full agent run fails or runs out of time"""
+    flights, images = searches
+    guide = {"destination": {"name": destination_city(request)}, "errors": {"agent": error}}
+    guide["flights"] = [flight.model_dump() for flight in flights.flights]
+    guide["images"] = [image.model_dump() for image in images.images]
+    guide["errors"].update({name: r.error for name, r in (("flights", flights), ("images", images)) if r.error})
+    return guide
+
+
+def is_cacheable(guide: Any) -> bool:
+    """Unparsed and partial guides are not worth caching for hours"""
+    return isinstance(guide, dict) and "text" not in guide and not guide.get("errors")
+
+
+def generate_travel_guide(request: TravelRequest, direct: bool = False,
+                          budget: Optional[RequestBudget] = None) -> dict:
+    """Run the agent for one request and return the parsed guide.
+
+    If the agent fails or overruns the request budget, the guide falls back to
+    the flights and images the tools can fetch directly, with an "errors" map.
+    """
+    budget = budget or RequestBudget()
+    if direct:
+        return generate_direct_travel_guide(request, budget)
+
+    query = f"""
+    Create a detailed travel guide in pure JSON with this exact structure:
+    {{
+      "destination": {{
+        "name": "{destination_city(request)}",
+        "overview": "string"
+      }},
+      "weather": {{
+        "description": "string",
+        "temperature": "string"
+      }},
+      "attractions": [
         {{
-          "destination": {{
-            "name": "{request.destination}",
-            "overview": "string"
-          }},
-          "weather": {{
-            "description": "string",
-            "temperature": "string"
-          }},
-          "attractions": [
-            {{
-              "name": "string",
-              "description": "string"
-            }}
-          ],
-          "flights": [
-            {{
-              "airline": "string",
-              "flight_number": "string",
-              "departure": "ISO8601 datetime",
-              "arrival": "ISO8601 datetime",
-              "duration": "string",
-              "price": "string"
-            }}
-          ],
-          "images": [
-            "image_url"
-          ]
+          "name": "string",
+          "description": "string"
         }}
+      ],
+      "flights": [
+        {{
+          "airline": "string",
+          "flight_number": "string",
+          "departure": "ISO8601 datetime",
+          "arrival": "ISO8601 datetime",
+          "duration": "string",
+          "price": "string"
+        }}
+      ],
+      "images": [
+        "image_url"
+      ]
+    }}
 
-        Rules:
-        - Always fill `overview` with 3–4 sentences about the destination.
-        - Each attraction must include both `name` and a short `description`.
-        - Use **AmadeusScheduleTool** to search flights from **{request.source}** to **{request.destination}** on {request.journey_date}.
-        - Include ALL flights returned by AmadeusScheduleTool, do not truncate.
-        - List at least 3 images from Pexels for attractions.
-        """
+    Rules:
+    - Always fill `overview` with 3–4 sentences about the destination.
+    - Each attraction must include both `name` and a short `description`.
+    - Use **AmadeusScheduleTool** to search flights from **{request.source}** to **{request.destination}** on {request.journey_date}.
+    - Include ALL flights returned by AmadeusScheduleTool, do not truncate.
+    - List at least 3 images from Pexels for attractions.
+    """
 
-        result = portia.run(query)
+    try:
+        # always enforce JSON return; the agent stops early enough for the fallback searches to run
+        raw_output = call_with_deadline(
+            "agent", budget.remaining_after(flight_tool.id, pexels_tool.id), run_agent_query, query)
+    except Exception as e:
+        return partial_travel_guide(request, str(e), run_direct_searches(
+            flight_tool, pexels_tool,
+            request.source, request.destination, request.journey_date, destination_city(request), budget,
+        ))
 
-        # always enforce JSON return
-        raw_output = result.outputs.final_output.value
+    import re, json
 
-        import re, json
+    # strip markdown fencing if present
+    cleaned = re.sub(r"```json|```", "", raw_output).strip()
 
-        # strip markdown fencing if present
-        cleaned = re.sub(r"```json|```", "", raw_output).strip()
+    try:
+        parsed = json.loads(cleaned)
+    except json.JSONDecodeError:
+        # fallback: wrap plain text into JSON
+        parsed = {"text": cleaned}
 
-        try:
-            parsed = json.loads(cleaned)
-        except json.JSONDecodeError:
-            # fallback: wrap plain text into JSON
-            parsed = {"text": cleaned}
+    return parsed
+
+
+def _refresh_travel_guide(key: str, request: TravelRequest, direct: bool = False) -> None:
+    try:
+        parsed = generate_travel_guide(request, direct)
+        if is_cacheable(parsed):
+            guide_cache.store(key, parsed)
+    except Exception:
+        import traceback; traceback.print_exc()
+    finally:
+        guide_cache.end_refresh(key)
+
+
+@app.post("/travel-guide")
+async def travel_guide(request: TravelRequest, response: Response, direct: bool = False):
+    """`direct=true` fetches flights and images straight from the tools, skipping the LLM for them"""
+    if portia is None:
+        raise HTTPException(status_code=500, detail="Service not properly initialized")
+
+    request = normalize_request(request)
+    key = guide_cache.key(request.source, request.destination, request.journey_date)
+    if direct:
+        key += "|direct"
+    cached, cache_state = guide_cache.lookup(key)
+    response.headers["X-Cache"] = cache_state
+
+    if cache_state == FRESH:
+        return {"result": cached}
+
+    if cache_state == STALE:
+        # Serve the stale guide right away and regenerate all of it on the agent pool
+        if guide_cache.begin_refresh(key):
+            try:
+                agent_pool.submit(_refresh_travel_guide, key, request, direct)
+            except PoolSaturated:
+                guide_cache.end_refresh(key)
+        return {"result": cached, "stale_sections": list(VOLATILE_SECTIONS)}
+
+    async def run_and_cache():
+        parsed = await agent_pool.run(generate_travel_guide, request, direct, RequestBudget())
+        if is_cacheable(parsed):
+            guide_cache.store(key, parsed)
+        return parsed
 
+    try:
+        parsed = await travel_guide_flights.do(key, run_and_cache)
         return {"result": parsed}
 
+    except PoolSaturated:
+        raise
     except Exception as e:
         import traceback; traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error generating travel guide: {str(e)}")
 
 
+# Fan-out step name -> section name emitted on /travel-guide/stream
+STREAM_SECTIONS = {
+    "destination_info": "overview",
+    "weather": "weather",
+    "places_to_visit": "attractions",
+    "flight_results": "flights",
+    "destination_images": "images",
+    "final_plan": "summary",
+}
+
+
+def _jsonable(value):
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+@app.get("/travel-guide/stream")
+async def travel_guide_stream(request: TravelRequest = Depends()):
+    """Stream each guide section as a Server-Sent Event as soon as its step finishes"""
+    request = normalize_request(request)
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+
+    def on_step(step: str, value, elapsed):
+        loop.call_soon_threadsafe(events.put_nowait, (STREAM_SECTIONS.get(step, step), value, elapsed))
+
+    def run_plan():
+        try:
+            result = run_travel_planning_agent(
+                source=request.source,
+                destination=request.destination,
+                date_of_journey=request.journey_date,
+                destination_city_name=destination_city(request),
+                execution_mode=EXECUTION_MODE_PARALLEL,
+                on_step=on_step,
+            )
+        except Exception as e:
+            result = {"status": "ERROR", "summary": str(e)}
+        loop.call_soon_threadsafe(events.put_nowait, ("complete", result, None))
+
+    # Submit before streaming starts so a saturated pool still answers 503
+    agent_pool.submit(run_plan)
+
+    async def event_stream():
+        while True:
+            section, value, elapsed = await events.get()
+            if section == "complete":
+                yield {"event": "complete", "data": json.dumps({
+                    "status": value.get("status"),
+                    "errors": value.get("errors", {}),
+                    "timings": value.get("timings", {}),
+                })}
+                return
+            yield {"event": section, "data": json.dumps({
+                "section": section,
+                "data": _jsonable(value),
+                "elapsed": elapsed,
+            })}
+
+    return EventSourceResponse(event_stream())
+
+
+BATCH_MAX_REQUESTS = int(os.getenv("TRAVEL_GUIDE_BATCH_MAX", "200"))
+BATCH_CONCURRENCY = int(os.getenv("TRAVEL_GUIDE_BATCH_CONCURRENCY", "4"))
+
+
+@app.post("/travel-guide/batch")
+async def travel_guide_batch(batch: BatchTravelRequest):
+    """Generate many direct-mode guides, streaming one NDJSON line per distinct route as it completes.
+
+    Repeated routes run once (the line lists every matching request index), and the
+    overview and images for a destination are generated once and shared by every
+    route to it. Results go into the same cache as `POST /travel-guide?direct=true`.
+    """
+    if portia is None:
+        raise HTTPException(status_code=500, detail="Service not properly initialized")
+    if len(batch.requests) > BATCH_MAX_REQUESTS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_REQUESTS} requests per batch")
+
+    requests = [normalize_request(request) for request in batch.requests]
+    routes = {}
+    for index, request in enumerate(requests):
+        key = guide_cache.key(request.source, request.destination, request.journey_date) + "|direct"
+        routes.setdefault(key, []).append(index)
+
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    sections = {}
+    destinations = set()
+
+    def destination_section(destination: str) -> asyncio.Future:
+        key = normalize_query(destination)
+        destinations.add(key)
+        if key not in sections:
+            sections[key] = asyncio.ensure_future(
+                agent_pool.run(generate_destination_section, destination, RequestBudget()))
+        # Shielded so one cancelled route doesn't cancel the section for the others
+        return asyncio.shield(sections[key])
+
+    async def section_for(destination: str) -> dict:
+        """The shared section, or an error stub so the route still returns its flights"""
+        key = normalize_query(destination)
+        try:
+            return await destination_section(destination)
+        except Exception as e:
+            # Routes still to come retry instead of inheriting a transient failure like PoolSaturated
+            if key in sections and sections[key].done():
+                del sections[key]
+            return {"guide": {"destination": {"name": destination}}, "images": [], "errors": {"overview": str(e)}}
+
+    async def flights_for(request: TravelRequest, budget: RequestBudget) -> FlightSearchResults:
+        timeout = budget.timeout_for(flight_tool.id)
+        try:
+            return await asyncio.wait_for(asyncio.to_thread(
+                deadline_context("flights", timeout).run, search_flights,
+                flight_tool, request.source, request.destination, request.journey_date,
+            ), timeout)
+        except asyncio.TimeoutError:
+            return FlightSearchResults(search_date=request.journey_date, source=request.source,
+                                       destination=request.destination, error=str(DeadlineExceeded("flights", timeout)))
+
+    async def build_guide(request: TravelRequest) -> dict:
+        section, flights = await asyncio.gather(
+            section_for(destination_city(request)), flights_for(request, RequestBudget()))
+        guide = {**section["guide"], "flights": [f.model_dump() for f in flights.flights], "images": section["images"]}
+        errors = {**section["errors"], **({"flights": flights.error} if flights.error else {})}
+        if errors:
+            guide["errors"] = errors
+        return guide
+
+    async def run_route(key: str, indices: List[int]):
+        request = requests[indices[0]]
+        cached, cache_state = guide_cache.lookup(key)
+        if cache_state == FRESH:
+            return indices, cached, cache_state
+
+        async def run_and_cache():
+            guide = await build_guide(request)
+            if is_cacheable(guide):
+                guide_cache.store(key, guide)
+            return guide
+
+        async with semaphore:
+            try:
+                return indices, await travel_guide_flights.do(key, run_and_cache), MISS
+            except Exception as e:
+                return indices, {"destination": {"name": destination_city(request)}, "errors": {"guide": str(e)}}, MISS
+
+    async def ndjson():
+        tasks = [asyncio.ensure_future(run_route(key, indices)) for key, indices in routes.items()]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                indices, guide, cache_state = await next_done
+                yield json.dumps({
+                    "indices": indices,
+                    "request": batch.requests[indices[0]].model_dump(),
+                    "cache": cache_state,
+                    "result": guide,
+                }, ensure_ascii=False) + "\n"
+            yield json.dumps({"summary": {
+                "requests": len(batch.requests),
+                "routes": len(routes),
+                "destinations": len(destinations),
+            }}) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@app.post("/travel-guide/jobs", status_code=202)
+async def create_travel_guide_job(request: TravelRequest):
+    """Queue a travel plan and return its job id straight away"""
+    request = normalize_request(request)
+    steps = [name.lstrip("$") for name in FANOUT_STEPS] + ["final_plan"]
+    job = job_runner.submit(
+        params=request.model_dump(),
+        steps=steps,
+        fn=partial(
+            run_travel_planning_agent,
+            source=request.source,
+            destination=request.destination,
+            date_of_journey=request.journey_date,
+            destination_city_name=destination_city(request),
+            execution_mode=EXECUTION_MODE_PARALLEL,
+        ),
+    )
+    return {"job_id": job.id, "status": job.status, "status_url": f"/travel-guide/jobs/{job.id}"}
+
+
+@app.get("/travel-guide/jobs/{job_id}")
+async def get_travel_guide_job(job_id: str):
+    job = job_runner.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job.to_dict()
+
+
+@app.get("/flights/calendar")
+async def flight_fare_calendar(source: str, destination: str, start_date: str,
+                               end_date: Optional[str] = None, flex_days: int = 0):
+    """Cheapest and median fare per day over a date range (optionally widened by ±flex_days)"""
+    try:
+        days = await asyncio.to_thread(
+            flight_tool.fare_calendar, source, destination, start_date, end_date, flex_days)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        # Token fetch failed or the breaker is open - nothing to fan out with
+        raise HTTPException(status_code=502, detail=f"Fare calendar unavailable: {e}")
+
+    priced = [day for day in days if day.min_price is not None]
+    return {
+        "source": airport_code(source),
+        "destination": airport_code(destination),
+        "days": [day.model_dump() for day in days],
+        "cheapest": min(priced, key=lambda day: day.min_price).model_dump() if priced else None,
+    }
+
+
+@app.get("/travel/compare")
+async def compare_travel_modes(source: str, destination: str, journey_date: str, sort: str = "balanced"):
+    """Flights and trains for one city pair and date, merged into one ranked list without the LLM"""
+    if sort not in SORT_ORDERS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(SORT_ORDERS)}")
+    return await asyncio.to_thread(
+        contextvars.copy_context().run, compare_modes,
+        flight_tool, rail_tool, source, destination, journey_date.strip(), sort, RequestBudget(),
+    )
+
+
+image_flights = SingleFlight()
+
+# Image bytes never change for an id and width, so browsers and CDNs may keep them for a year
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@app.get("/images/{image_id}")
+async def proxied_image(image_id: str, request: Request, w: Optional[int] = None):
+    """An image or video poster from a search result, served from the on-disk cache (`w` picks a thumbnail width)"""
+    try:
+        # Concurrent misses for the same image and width download it once
+        image = await image_flights.do(f"{image_id}|{snap_width(w)}", lambda: asyncio.to_thread(
+            contextvars.copy_context().run, image_store.get, image_id, w))
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown image id")
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Image unavailable: {e}")
+
+    headers = {"ETag": image.etag, "Cache-Control": IMAGE_CACHE_CONTROL}
+    if image.etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(content=image.body, media_type=image.content_type, headers=headers)
+
+
+@app.get("/locations/suggest")
+async def suggest_locations(q: str, kind: Optional[str] = None, limit: int = 10):
+    """Autocomplete over airports and railway stations; tolerates a typo or two ("bengaluur")"""
+    if kind is not None and kind not in KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {', '.join(KINDS)}")
+    limit = max(1, min(limit, 50))
+    return {"query": q, "suggestions": [location.model_dump() for location in location_index.suggest(q, kind, limit)]}
+
+
+def _plan_itinerary(legs: List[dict]) -> dict:
+    return plan_itinerary(get_agent_context(), legs, RequestBudget())
+
+
+@app.post("/itinerary")
+async def itinerary(request: ItineraryRequest):
+    """Plan a multi-city trip; each destination is researched once and each leg's flights searched once"""
+    try:
+        return await agent_pool.run(_plan_itinerary, [normalize_request(leg).model_dump() for leg in request.legs])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 #uvicorn api:app --reload
\ No newline at end of file
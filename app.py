@@ -1,22 +1,29 @@
 import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dotenv import load_dotenv
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 from pydantic import BaseModel
 import json
 
 # Correct imports for current Portia SDK version
 from portia import (
-    Config,
-    LLMProvider,
     Portia,
     ToolRegistry,
     example_tool_registry,
 )
 from portia.plan import PlanBuilder
 
-# Import your custom tools
-from tools.pexels_tool import PexelsSearchTool
-from tools.amadeus_tool import AmadeusScheduleTool
+from deadlines import DeadlineExceeded, RequestBudget, abandon, call_with_deadline, deadline_context, track_abandoned
+from llm_config import build_portia_config
+from tools import metrics
+
+# Import your custom tools (and the typed results they return)
+from tools.pexels_tool import ImageResult, PexelsSearchTool
+from tools.amadeus_tool import AmadeusScheduleTool, FlightOffer
+from tools.railradar_tool import RailRadarSearchTool
+from tools.locations import AIRPORT, airport_code, city_name
 
 load_dotenv()
 
@@ -55,17 +62,6 @@ class PlacesToVisit(BaseModel):
     error: Optional[str] = None
 
 
-class FlightOffer(BaseModel):
-    airline: Optional[str] = None
-    flight_number: Optional[str] = None
-    departure_time: Optional[str] = None
-    arrival_time: Optional[str] = None
-    duration: Optional[str] = None
-    price: Optional[str] = None
-    currency: Optional[str] = None
-    stops: Optional[int] = None
-
-
 class FlightSearchResults(BaseModel):
     flights: List[FlightOffer] = []
     search_date: Optional[str] = None
@@ -75,14 +71,6 @@ class FlightSearchResults(BaseModel):
     error: Optional[str] = None
 
 
-class ImageResult(BaseModel):
-    url: str
-    photographer: Optional[str] = None
-    alt_text: Optional[str] = None
-    width: Optional[int] = None
-    height: Optional[int] = None
-
-
 class ImageSearchResults(BaseModel):
     images: List[ImageResult] = []
     query: Optional[str] = None
@@ -90,6 +78,19 @@ class ImageSearchResults(BaseModel):
     error: Optional[str] = None
 
 
+# Step tasks shared by the sequential plan and the parallel fan-out plans
+DESTINATION_INFO_TASK = "Search for comprehensive destination information about the city including current weather conditions, climate, best time to visit, cultural highlights, historical significance, and general tourist information"
+
+PLACES_TO_VISIT_TASK = "Search for top tourist attractions, historical sites, cultural landmarks, and must-visit places in the destination city. Include detailed descriptions, historical significance, cultural importance, and compelling reasons why tourists should visit each place"
+
+FLIGHT_SEARCH_TASK = "Search for available flight options from source to destination on the specified date using Amadeus API. Include comprehensive flight details like airlines, departure/arrival times, duration, prices, and number of stops"
+
+WEATHER_TASK = "Search for the current weather conditions and the short-term forecast in the destination city, including temperature, humidity, wind and general conditions"
+
+DESTINATION_IMAGES_TASK = "Search for high-quality, beautiful images of tourist attractions, landmarks, cultural sites, and scenic places in the destination city for holiday planning and visual inspiration"
+
+COMPILE_PLAN_TASK = "Create a comprehensive travel plan by combining all gathered information. Handle any API failures gracefully by acknowledging failures and providing recommendations based on available data. Generate detailed summary, travel recommendations, and status report. If any step failed, include appropriate error messages without generating false data."
+
 
 def create_travel_plan():
     """Create travel planning agent using stable PlanBuilder with CORRECT tool IDs"""
@@ -113,7 +114,7 @@ def create_travel_plan():
 
         # STEP 1: Get detailed destination information including weather
     ).step(
-        task="Search for comprehensive destination information about the city including current weather conditions, climate, best time to visit, cultural highlights, historical significance, and general tourist information",
+        task=DESTINATION_INFO_TASK,
         tool_id="search_tool",
         output="$destination_info"
     ).input(
@@ -122,7 +123,7 @@ def create_travel_plan():
 
         # STEP 2: Get places to visit with significance and reasons
     ).step(
-        task="Search for top tourist attractions, historical sites, cultural landmarks, and must-visit places in the destination city. Include detailed descriptions, historical significance, cultural importance, and compelling reasons why tourists should visit each place",
+        task=PLACES_TO_VISIT_TASK,
         tool_id="search_tool",
         output="$places_to_visit"
     ).input(
@@ -131,7 +132,7 @@ def create_travel_plan():
 
         # STEP 3: Search flights using Amadeus tool - CORRECTED TOOL ID
     ).step(
-        task="Search for available flight options from source to destination on the specified date using Amadeus API. Include comprehensive flight details like airlines, departure/arrival times, duration, prices, and number of stops",
+        task=FLIGHT_SEARCH_TASK,
         tool_id="amadeus_schedule",  # ← CORRECTED: Use actual tool ID from AmadeusScheduleTool.id
         output="$flight_results"
     ).input(
@@ -148,7 +149,7 @@ def create_travel_plan():
 
         # STEP 4: Get destination images using Pexels tool - CORRECTED TOOL ID
     ).step(
-        task="Search for high-quality, beautiful images of tourist attractions, landmarks, cultural sites, and scenic places in the destination city for holiday planning and visual inspiration",
+        task=DESTINATION_IMAGES_TASK,
         tool_id="pexels_search",  # ← CORRECTED: Use actual tool ID from PexelsSearchTool.id
         output="$destination_images"
     ).input(
@@ -157,7 +158,7 @@ def create_travel_plan():
 
         # STEP 5: Compile comprehensive travel plan with error handling
     ).step(
-        task="Create a comprehensive travel plan by combining all gathered information. Handle any API failures gracefully by acknowledging failures and providing recommendations based on available data. Generate detailed summary, travel recommendations, and status report. If any step failed, include appropriate error messages without generating false data.",
+        task=COMPILE_PLAN_TASK,
         tool_id="llm_tool",
         output="$final_plan"
     ).input(
@@ -190,46 +191,313 @@ def create_travel_plan():
 
 
 # =============================================================================
-# CORRECTED MAIN EXECUTION FUNCTION
+# PARALLEL FAN-OUT PLANS
 # =============================================================================
 
-def run_travel_planning_agent(source: str, destination: str, date_of_journey: str, destination_city_name: str):
-    """Execute the travel planning agent with corrected tool registration"""
+EXECUTION_MODE_SEQUENTIAL = "sequential"
+EXECUTION_MODE_PARALLEL = "parallel"
+
+# The upstream steps don't depend on each other, so in parallel mode each one runs
+# as its own single-step plan and only the compile step waits for all of them.
+FANOUT_STEPS = {
+    "$destination_info": {
+        "task": DESTINATION_INFO_TASK,
+        "tool_id": "search_tool",
+        "inputs": [("destination_city_name", "Full destination city name for information search")],
+    },
+    "$weather": {
+        "task": WEATHER_TASK,
+        "tool_id": "search_tool",
+        "inputs": [("destination_city_name", "Destination city name for weather search")],
+    },
+    "$places_to_visit": {
+        "task": PLACES_TO_VISIT_TASK,
+        "tool_id": "search_tool",
+        "inputs": [("destination_city_name", "Destination city name for places search")],
+    },
+    "$flight_results": {
+        "task": FLIGHT_SEARCH_TASK,
+        "tool_id": "amadeus_schedule",
+        "inputs": [
+            ("source", "Source airport code (e.g., DEL)"),
+            ("destination", "Destination airport code (e.g., BLR)"),
+            ("date_of_journey", "Journey date in YYYY-MM-DD format"),
+        ],
+    },
+    "$destination_images": {
+        "task": DESTINATION_IMAGES_TASK,
+        "tool_id": "pexels_search",
+        "inputs": [("destination_city_name", "Destination city name for image search")],
+    },
+}
+
+COMPILE_INPUTS = [
+    ("destination_info", "Destination information from search step"),
+    ("weather", "Current weather from search step"),
+    ("places_to_visit", "Places to visit information from search step"),
+    ("flight_results", "Flight search results from Amadeus API"),
+    ("destination_images", "Destination images from Pexels API"),
+    ("source", "Source airport code for context"),
+    ("destination", "Destination airport code for context"),
+    ("date_of_journey", "Journey date for context"),
+    ("destination_city_name", "Destination city name for context"),
+]
+
+
+def create_step_plan(output_name: str):
+    """Create a single-step plan for one of the independent fan-out steps"""
+
+    spec = FANOUT_STEPS[output_name]
+
+    builder = PlanBuilder(f"Travel Planning Agent - {output_name.lstrip('$')} step")
+    for name, description in spec["inputs"]:
+        builder = builder.input(name=name, description=description)
+
+    builder = builder.step(
+        task=spec["task"],
+        tool_id=spec["tool_id"],
+        output=output_name
+    )
+    for name, description in spec["inputs"]:
+        builder = builder.input(name=name, description=description)
+
+    return builder.build()
+
+
+def create_compile_plan():
+    """Create the final llm_tool step that joins the fan-out results"""
 
+    builder = PlanBuilder("Travel Planning Agent - compile step")
+    for name, description in COMPILE_INPUTS:
+        builder = builder.input(name=name, description=description)
+
+    builder = builder.step(
+        task=COMPILE_PLAN_TASK,
+        tool_id="llm_tool",
+        output="$final_plan"
+    )
+    for name, description in COMPILE_INPUTS:
+        builder = builder.input(name=name, description=description)
+
+    return builder.build()
+
+
+# Called with (step_name, value, elapsed_seconds) when a fan-out step finishes
+StepCallback = Callable[[str, Any, Optional[float]], None]
+
+
+def _output_value(output):
+    """Unwrap a Portia step output into its plain value"""
+    if output is None:
+        return None
+    if isinstance(output, dict):
+        return output.get("value")
+    return getattr(output, "value", output)
+
+
+def _as_plain(value):
+    """Turn typed tool outputs (pydantic models, lists of them) into JSON-able data"""
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, list):
+        return [_as_plain(v) for v in value]
+    return value
+
+
+def _timed_run_plan(portia, plan, plan_run_inputs, step: str):
+    start = time.perf_counter()
+    with metrics.timed(metrics.STEP_DURATION, f"step:{step}", step=step):
+        plan_run = portia.run_plan(plan, plan_run_inputs=plan_run_inputs)
+    return plan_run, round(time.perf_counter() - start, 3)
+
+
+def run_fanout_steps(context: "AgentContext", plan_run_inputs: Dict[str, str], on_step: Optional[StepCallback] = None,
+                     budget: Optional[RequestBudget] = None, steps: Optional[List[str]] = None):
+    """Run the independent steps concurrently and return their outputs, timings and errors
+
+    `steps` limits the run to a subset of FANOUT_STEPS (all of them by default);
+    plan_run_inputs only needs the inputs those steps use.
+
+    on_step(step_name, value, elapsed) is called as soon as each step finishes, in
+    completion order, so callers can stream sections before the compile step runs.
+    A step still running at its tool's deadline (see deadlines.py) is abandoned:
+    its output is None and step_errors says why.
+    """
+
+    budget = budget or RequestBudget()
+    step_outputs: Dict[str, Any] = {}
+    timings: Dict[str, Optional[float]] = {}
+    step_errors: Dict[str, str] = {}
+
+    def finish(output_name: str, value, elapsed, error: Optional[str] = None):
+        step = output_name.lstrip("$")
+        step_outputs[output_name] = value
+        timings[step] = elapsed
+        if error:
+            print(f"Step {output_name} failed: {error}")
+            step_errors[step] = error
+        if on_step:
+            on_step(step, _output_value(value), elapsed)
+
+    steps = list(steps or FANOUT_STEPS)
+    executor = ThreadPoolExecutor(max_workers=len(steps))
     try:
-        # Setup configuration - EXACT SAME AS YOUR WORKING EXAMPLE
-        config = Config.from_default(
-            llm_provider=LLMProvider.GOOGLE,
-            default_model="google/gemini-2.5-flash",
-            google_api_key=os.getenv('GOOGLE_API_KEY')
+        futures = {}
+        deadlines = {}
+        for output_name in steps:
+            spec = FANOUT_STEPS[output_name]
+            timeout = budget.timeout_for(spec["tool_id"])
+            future = executor.submit(
+                deadline_context(output_name.lstrip("$"), timeout).run,
+                _timed_run_plan,
+                context.portia,
+                context.step_plans[output_name],
+                {name: plan_run_inputs[name] for name, _ in spec["inputs"]},
+                output_name.lstrip("$"),
+            )
+            futures[future] = output_name
+            deadlines[future] = (time.monotonic() + timeout, timeout)
+
+        pending = set(futures)
+        while pending:
+            next_deadline = min(deadlines[f][0] for f in pending)
+            done, pending = wait(pending, timeout=max(0.0, next_deadline - time.monotonic()),
+                                 return_when=FIRST_COMPLETED)
+
+            for future in done:
+                try:
+                    plan_run, elapsed = future.result()
+                    finish(futures[future], plan_run.outputs.step_outputs.get(futures[future]), elapsed)
+                except Exception as e:
+                    finish(futures[future], None, None, str(e))
+
+            now = time.monotonic()
+            for future in [f for f in pending if deadlines[f][0] <= now]:
+                pending.discard(future)
+                if not future.cancel():
+                    track_abandoned(future)
+                finish(futures[future], None, None, str(DeadlineExceeded(futures[future].lstrip("$"), deadlines[future][1])))
+    finally:
+        abandon(executor)
+
+    return step_outputs, timings, step_errors
+
+
+def run_parallel_plan(context: "AgentContext", plan_run_inputs: Dict[str, str],
+                      on_step: Optional[StepCallback] = None, budget: Optional[RequestBudget] = None):
+    """Fan out the independent steps, then join them into the compile step"""
+
+    budget = budget or RequestBudget()
+    step_outputs, timings, step_errors = run_fanout_steps(context, plan_run_inputs, on_step, budget)
+
+    compile_inputs = dict(plan_run_inputs)
+    for output_name in FANOUT_STEPS:
+        value = _as_plain(_output_value(step_outputs.get(output_name)))
+        if isinstance(value, (list, dict)):
+            value = json.dumps(value, ensure_ascii=False)
+        compile_inputs[output_name.lstrip("$")] = str(value) if value else "Step failed - no data available"
+
+    # The fan-out sections stand on their own, so a late or failed compile step
+    # only costs the summary
+    final_output = None
+    try:
+        compile_run, timings["final_plan"] = call_with_deadline(
+            "final_plan", budget.timeout_for("llm_tool"),
+            _timed_run_plan, context.portia, context.compile_plan, compile_inputs, "final_plan",
         )
+        step_outputs["$final_plan"] = compile_run.outputs.step_outputs.get("$final_plan")
+        final_output = compile_run.outputs.final_output
+    except Exception as e:
+        print(f"Step $final_plan failed: {e}")
+        step_errors["final_plan"] = str(e)
+        timings["final_plan"] = None
+    if on_step:
+        on_step("final_plan", _output_value(final_output), timings["final_plan"])
+
+    return step_outputs, final_output, timings, step_errors
+
+
+# =============================================================================
+# PROCESS-LEVEL AGENT CONTEXT
+# =============================================================================
+
+class AgentContext:
+    """Portia, its tool registry and the prebuilt plans, shared by every run and by api.py"""
+
+    def __init__(self):
+        # Setup configuration - EXACT SAME AS YOUR WORKING EXAMPLE
+        self.config = build_portia_config()
 
         # Setup tools - EXACT SAME AS YOUR WORKING EXAMPLE
-        pexels_tool = PexelsSearchTool(api_key=os.getenv('PEXELS_API_KEY'))
-        flight_tool = AmadeusScheduleTool(
+        self.pexels_tool = PexelsSearchTool(api_key=os.getenv('PEXELS_API_KEY'))
+        self.flight_tool = AmadeusScheduleTool(
             api_key=os.getenv("AMADEUS_API_KEY"),
             api_secret=os.getenv("AMADEUS_API_SECRET")
         )
-
-        # Debug: Print tool IDs to verify
-        print(f"Pexels tool ID: {pexels_tool.id}")
-        print(f"Amadeus tool ID: {flight_tool.id}")
+        self.rail_tool = RailRadarSearchTool()
 
         # Create registry - EXACT SAME AS YOUR WORKING EXAMPLE
-        all_custom_tools = [pexels_tool, flight_tool]
-        custom_registry = ToolRegistry(all_custom_tools)
-        combined_registry = example_tool_registry + custom_registry
+        custom_registry = ToolRegistry([self.pexels_tool, self.flight_tool, self.rail_tool])
+        self.registry = example_tool_registry + custom_registry
+
+        self.portia = Portia(config=self.config, tools=self.registry)
+
+        # Plans are immutable once built, so they are safe to share across runs
+        self.travel_plan = create_travel_plan()
+        self.step_plans = {output_name: create_step_plan(output_name) for output_name in FANOUT_STEPS}
+        self.compile_plan = create_compile_plan()
+
+
+_agent_context: Optional[AgentContext] = None
+_agent_context_lock = threading.Lock()
 
-        # Debug: Print all available tool IDs
-        print("Available tools:")
-        for tool in combined_registry.tools:
-            print(f"- {tool.id}")
 
-        # Initialize Portia - EXACT SAME AS YOUR WORKING EXAMPLE
-        portia = Portia(config=config, tools=combined_registry)
+def get_agent_context() -> AgentContext:
+    """Build the agent context on first use and reuse it for every later run"""
+    global _agent_context
 
-        # Create and run plan
-        plan = create_travel_plan()
+    if _agent_context is None:
+        with _agent_context_lock:
+            if _agent_context is None:
+                _agent_context = AgentContext()
+                print(f"Travel agent ready with tools: {[tool.id for tool in _agent_context.registry.tools]}")
+    return _agent_context
+
+
+# =============================================================================
+# CORRECTED MAIN EXECUTION FUNCTION
+# =============================================================================
+
+def run_travel_planning_agent(source: str, destination: str, date_of_journey: str,
+                              destination_city_name: Optional[str] = None,
+                              execution_mode: str = EXECUTION_MODE_SEQUENTIAL,
+                              on_step: Optional[StepCallback] = None,
+                              budget: Optional[RequestBudget] = None):
+    """Execute the travel planning agent with corrected tool registration
+
+    execution_mode="parallel" runs the destination, places, flight and image steps
+    concurrently and joins them into the compile step; the result then carries a
+    per-step timing breakdown under "timings". In parallel mode on_step is called
+    as each step finishes, and steps that fail or miss their deadline leave an
+    error on their own section instead of failing the whole run.
+
+    Both modes stop waiting once `budget` (TRAVEL_AGENT_REQUEST_BUDGET by default)
+    runs out.
+
+    Source and destination may be IATA codes or city names; they are resolved to
+    codes, and destination_city_name defaults to the destination's city.
+    """
+
+    run_start = time.perf_counter()
+    budget = budget or RequestBudget()
+    source, destination = airport_code(source), airport_code(destination)
+    destination_city_name = destination_city_name or city_name(destination, AIRPORT)
+
+    try:
+        if execution_mode not in (EXECUTION_MODE_SEQUENTIAL, EXECUTION_MODE_PARALLEL):
+            raise ValueError(f"Unknown execution mode: {execution_mode}")
+
+        context = get_agent_context()
 
         # Execute with inputs - CORRECTED: Remove $ prefix for plan_run_inputs
         plan_run_inputs = {
@@ -239,35 +507,56 @@ def run_travel_planning_agent(source: str, destination: str, date_of_journey: st
             "destination_city_name": destination_city_name
         }
 
-        plan_run = portia.run_plan(plan, plan_run_inputs=plan_run_inputs)
+        if execution_mode == EXECUTION_MODE_PARALLEL:
+            step_outputs, final_plan_output, timings, step_errors = run_parallel_plan(
+                context, plan_run_inputs, on_step, budget)
+        else:
+            # One Portia run has no partial outputs to return, so the budget bounds it as a whole
+            plan_run, _ = call_with_deadline(
+                "sequential_plan", budget.remaining(),
+                _timed_run_plan, context.portia, context.travel_plan, plan_run_inputs, "sequential_plan",
+            )
+            step_outputs = plan_run.outputs.step_outputs
+            final_plan_output = plan_run.outputs.final_output
+            timings = {}
+            step_errors = {}
 
         # Extract outputs safely
-        step_outputs = plan_run.outputs.step_outputs
-        final_output = plan_run.outputs.final_output.value if hasattr(plan_run.outputs.final_output, 'value') else str(
-            plan_run.outputs.final_output)
+        if final_plan_output is None:
+            final_output = f"Summary unavailable: {step_errors.get('final_plan', 'compile step failed')}"
+        else:
+            final_output = final_plan_output.value if hasattr(final_plan_output, 'value') else str(
+                final_plan_output)
 
         # Parse outputs with error handling
         def safe_parse_output(output_data):
-            if isinstance(output_data, dict) and 'value' in output_data:
-                return output_data['value']
-            return output_data or {}
+            return _as_plain(_output_value(output_data)) or {}
 
         destination_info = safe_parse_output(step_outputs.get("$destination_info", {}))
+        weather_info = safe_parse_output(step_outputs.get("$weather", {}))
         places_info = safe_parse_output(step_outputs.get("$places_to_visit", {}))
         flight_info = safe_parse_output(step_outputs.get("$flight_results", {}))
         images_info = safe_parse_output(step_outputs.get("$destination_images", {}))
 
+        def section_error(step, output, message):
+            if output:
+                return None
+            return f"{message}: {step_errors[step]}" if step in step_errors else message
+
         # Create structured response
         result = {
             "destination_info": {
                 "city_name": destination_city_name,
                 "description": str(destination_info)[:500] if destination_info else "Information not available",
-                "error": None if destination_info else "Failed to get destination info"
+                # Weather is only searched separately in parallel mode
+                "weather": {"condition": str(weather_info)[:500]} if weather_info else (
+                    {"error": section_error("weather", None, "Failed to get weather")} if "weather" in step_errors else None),
+                "error": section_error("destination_info", destination_info, "Failed to get destination info")
             },
             "places_to_visit": {
                 "places": places_info if isinstance(places_info, list) else [],
                 "total_places": len(places_info) if isinstance(places_info, list) else 0,
-                "error": None if places_info else "Failed to get places information"
+                "error": section_error("places_to_visit", places_info, "Failed to get places information")
             },
             "flight_results": {
                 "flights": flight_info if isinstance(flight_info, list) else [],
@@ -275,13 +564,13 @@ def run_travel_planning_agent(source: str, destination: str, date_of_journey: st
                 "source": source,
                 "destination": destination,
                 "total_results": len(flight_info) if isinstance(flight_info, list) else 0,
-                "error": None if flight_info else "Failed to invoke Amadeus API"
+                "error": section_error("flight_results", flight_info, "Failed to invoke Amadeus API")
             },
             "destination_images": {
                 "images": images_info if isinstance(images_info, list) else [],
                 "query": destination_city_name,
                 "total_images": len(images_info) if isinstance(images_info, list) else 0,
-                "error": None if images_info else "Failed to invoke Pexels API"
+                "error": section_error("destination_images", images_info, "Failed to invoke Pexels API")
             },
             "summary": final_output,
             "recommendations": [
@@ -290,13 +579,18 @@ def run_travel_planning_agent(source: str, destination: str, date_of_journey: st
                 "Plan your itinerary based on place significance"
             ],
             "status": "SUCCESS" if all(
-                [destination_info, places_info, flight_info, images_info]) else "PARTIAL_SUCCESS",
+                [destination_info, places_info, flight_info, images_info]) and not step_errors else "PARTIAL_SUCCESS",
+            "errors": step_errors,
+            "execution_mode": execution_mode,
+            "timings": {**timings, "total": round(time.perf_counter() - run_start, 3)},
             "generated_at": "2025-08-24T11:12:00Z"
         }
 
+        metrics.AGENT_RUN_DURATION.observe(result["timings"]["total"], mode=execution_mode, outcome="ok")
         return result
 
     except Exception as e:
+        metrics.AGENT_RUN_DURATION.observe(time.perf_counter() - run_start, mode=execution_mode, outcome="error")
         return {
             "destination_info": {"city_name": destination_city_name, "error": f"System error: {str(e)}"},
             "places_to_visit": {"places": [], "total_places": 0, "error": "System error prevented places search"},
@@ -308,6 +602,9 @@ def run_travel_planning_agent(source: str, destination: str, date_of_journey: st
             "summary": f"Travel planning failed: {str(e)}",
             "recommendations": ["Check API keys", "Verify connectivity", "Try again later"],
             "status": "ERROR",
+            "errors": {"run": str(e)},
+            "execution_mode": execution_mode,
+            "timings": {"total": round(time.perf_counter() - run_start, 3)},
             "generated_at": "2025-08-24T11:12:00Z"
         }
 
@@ -320,7 +617,8 @@ if __name__ == "__main__":
         source="DEL",
         destination="BLR",
         date_of_journey="2025-09-18",
-        destination_city_name="Bengaluru"
+        destination_city_name="Bengaluru",
+        execution_mode=os.getenv("TRAVEL_AGENT_EXECUTION_MODE", EXECUTION_MODE_SEQUENTIAL)
     )
 
     # Print JSON result for frontend
@@ -331,5 +629,6 @@ if __name__ == "__main__":
 
     # Only check dictionary values for errors, avoid strings
     successful_components = sum(1 for key, value in result.items()
-                                if isinstance(value, dict) and not value.get('error'))
+                                if isinstance(value, dict) and key != "timings" and not value.get('error'))
     print(f"📊 Components: {successful_components} successful")
+    print(f"⏱️ Timings: {result['timings']}")
@@ -0,0 +1,49 @@
+"""Per-call setup overhead of run_travel_planning_agent, before and after AgentContext.
+
+"before" rebuilds the config, tools, registry, Portia and plans the way every call
+used to; "after" goes through get_agent_context(), which builds them once.
+No plan is executed, so no LLM or upstream API is called.
+
+Usage: python benchmarks/bench_agent_setup.py [iterations]
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Placeholder keys are enough to build everything without network access
+for key in ("GOOGLE_API_KEY", "PEXELS_API_KEY", "AMADEUS_API_KEY", "AMADEUS_API_SECRET"):
+    os.environ.setdefault(key, "benchmark-placeholder")
+
+import app  # noqa: E402
+
+
+def time_calls(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(label, samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1] if len(samples) >= 20 else samples[-1]
+    print(f"{label:<8} mean {statistics.mean(samples):8.3f} ms   p50 {statistics.median(samples):8.3f} ms   "
+          f"p95 {p95:8.3f} ms")
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    before = time_calls(app.AgentContext, iterations)
+    # First call pays the one-off build; every later call is a cached lookup
+    app.get_agent_context()
+    after = time_calls(app.get_agent_context, iterations)
+
+    print(f"Per-call agent setup over {iterations} calls")
+    report("before", before)
+    report("after", after)
@@ -0,0 +1,152 @@
+"""End-to-end latency benchmark for the travel agent.
+
+Drives one target at several concurrency levels and reports p50/p95/p99 latency,
+throughput, errors and how many upstream calls each level cost (read from the
+simulator's /__stats endpoint).
+
+Targets:
+  api        POST {url}/travel-guide       (uvicorn api:app)
+  plan-trip  POST {url}/plan-trip          (uvicorn travelAgent_api:app)
+  agent      run_travel_planning_agent()   in-process, no server needed
+
+Typical run against the offline simulator:
+
+    python benchmarks/upstream_sim.py --port 9100 &
+    export AMADEUS_BASE_URL=http://127.0.0.1:9100 PEXELS_BASE_URL=http://127.0.0.1:9100 \\
+           RAILRADAR_BASE_URL=http://127.0.0.1:9100 TRAVEL_AGENT_LLM_BASE_URL=http://127.0.0.1:9100/v1
+    uvicorn api:app --port 8000 &
+    python benchmarks/load_test.py --target api --concurrency 1,4,16 --requests 40
+
+--distinct-routes N spreads requests over N routes so caching and request
+coalescing can be measured against the all-identical case (N=1).
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ROUTES = [
+    ("DEL", "BLR", "Bengaluru"), ("BOM", "GOI", "Goa"), ("DEL", "JAI", "Jaipur"),
+    ("BLR", "COK", "Kochi"), ("MAA", "CCU", "Kolkata"), ("HYD", "PNQ", "Pune"),
+    ("DEL", "VNS", "Varanasi"), ("BOM", "UDR", "Udaipur"), ("CCU", "GAU", "Guwahati"),
+    ("BLR", "DEL", "Delhi"), ("PNQ", "BOM", "Mumbai"), ("AMD", "IXL", "Leh"),
+]
+
+
+def percentile(samples, pct):
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def make_caller(args):
+    if args.target == "agent":
+        from app import run_travel_planning_agent
+
+        def call(i):
+            source, destination, city = ROUTES[i % args.distinct_routes]
+            result = run_travel_planning_agent(source, destination, args.date, city, execution_mode=args.mode)
+            return result.get("status") != "ERROR"
+        return call
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(args.concurrency_levels))
+    session.mount("http://", adapter)
+    path = "/travel-guide" if args.target == "api" else "/plan-trip"
+
+    def call(i):
+        source, destination, _ = ROUTES[i % args.distinct_routes]
+        params = {"direct": "true"} if args.direct else None
+        resp = session.post(f"{args.url}{path}", params=params, timeout=args.timeout,
+                            json={"source": source, "destination": destination, "journey_date": args.date})
+        return resp.status_code < 400
+    return call
+
+
+def sim_stats(sim_url):
+    if not sim_url:
+        return None
+    try:
+        return requests.get(f"{sim_url}/__stats", timeout=5).json()["calls"]
+    except requests.RequestException:
+        return None
+
+
+def run_level(call, concurrency, total):
+    latencies, failures = [], 0
+
+    def timed(i):
+        start = time.perf_counter()
+        try:
+            ok = call(i)
+        except Exception:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for elapsed, ok in executor.map(timed, range(total)):
+            latencies.append(elapsed)
+            failures += 0 if ok else 1
+    wall = time.perf_counter() - wall_start
+
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": failures,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 1),
+        "throughput_rps": round(total / wall, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=["api", "plan-trip", "agent"], default="api")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--sim", default="http://127.0.0.1:9100", help="simulator URL for upstream call counts")
+    parser.add_argument("--concurrency", default="1,4,16")
+    parser.add_argument("--requests", type=int, default=40, help="requests per concurrency level")
+    parser.add_argument("--distinct-routes", type=int, default=len(ROUTES))
+    parser.add_argument("--date", default="2025-09-18")
+    parser.add_argument("--mode", default="parallel", help="execution mode for --target agent")
+    parser.add_argument("--direct", action="store_true", help="use ?direct=true on the HTTP targets")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    args.concurrency_levels = [int(c) for c in args.concurrency.split(",")]
+    args.distinct_routes = max(1, min(args.distinct_routes, len(ROUTES)))
+    call = make_caller(args)
+
+    results = []
+    for concurrency in args.concurrency_levels:
+        before = sim_stats(args.sim)
+        level = run_level(call, concurrency, args.requests)
+        after = sim_stats(args.sim)
+        if before is not None and after is not None:
+            level["upstream_calls"] = {k: after.get(k, 0) - before.get(k, 0) for k in after if after.get(k, 0) - before.get(k, 0)}
+        results.append(level)
+
+        if not args.json:
+            print(f"c={level['concurrency']:<3} n={level['requests']:<4} err={level['errors']:<3} "
+                  f"p50={level['p50_ms']:>8}ms p95={level['p95_ms']:>8}ms p99={level['p99_ms']:>8}ms "
+                  f"{level['throughput_rps']:>7} req/s  upstream={level.get('upstream_calls', 'n/a')}")
+
+    if args.json:
+        print(json.dumps({"target": args.target, "levels": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
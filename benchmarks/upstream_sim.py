@@ -0,0 +1,319 @@
+"""Offline stand-in for every upstream the travel agent calls.
+
+Serves, on one port:
+  POST /v1/security/oauth2/token        Amadeus token
+  GET  /v2/shopping/flight-offers       Amadeus flight offers
+  GET  /v1/search                       Pexels photos
+  GET  /videos/search                   Pexels videos
+  GET  /api/v1/trains/between           RailRadar
+  POST /v1/chat/completions             fake OpenAI-compatible LLM
+  GET  /__stats, POST /__reset          per-upstream call counters
+
+Each upstream has its own latency, jitter and error rate, set with
+--profile NAME=LATENCY:JITTER:ERROR_RATE (seconds, seconds, 0-1), e.g.
+
+    python benchmarks/upstream_sim.py --port 9100 --profile llm=1.2:0.4:0 --profile amadeus=0.3:0.1:0.05
+
+Point the service at it with:
+
+    AMADEUS_BASE_URL=http://127.0.0.1:9100
+    PEXELS_BASE_URL=http://127.0.0.1:9100
+    RAILRADAR_BASE_URL=http://127.0.0.1:9100
+    TRAVEL_AGENT_LLM_BASE_URL=http://127.0.0.1:9100/v1
+
+The fake LLM answers structured-output and tool-call requests with the smallest
+value that satisfies the requested JSON schema, so Portia's planning and
+execution agents get well-formed (if bland) answers. Portia's built-in
+search_tool talks to Tavily directly and is not simulated.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+DEFAULT_PROFILES = {
+    "amadeus": (0.35, 0.15, 0.0),
+    "pexels": (0.12, 0.05, 0.0),
+    "railradar": (0.25, 0.10, 0.0),
+    "llm": (1.0, 0.4, 0.0),
+}
+
+ROUTES = {
+    ("POST", "/v1/security/oauth2/token"): ("amadeus", "token"),
+    ("GET", "/v2/shopping/flight-offers"): ("amadeus", "flight_offers"),
+    ("GET", "/v1/search"): ("pexels", "photos"),
+    ("GET", "/videos/search"): ("pexels", "videos"),
+    ("GET", "/api/v1/trains/between"): ("railradar", "trains"),
+    ("POST", "/v1/chat/completions"): ("llm", "chat"),
+}
+
+
+class Simulator:
+    def __init__(self, profiles):
+        self.profiles = profiles
+        self.calls = Counter()
+        self.errors = Counter()
+        self.lock = threading.Lock()
+
+    def count(self, name: str, error: bool = False) -> None:
+        with self.lock:
+            self.calls[name] += 1
+            if error:
+                self.errors[name] += 1
+
+    def stats(self):
+        with self.lock:
+            return {"calls": dict(self.calls), "errors": dict(self.errors)}
+
+    def reset(self) -> None:
+        with self.lock:
+            self.calls.clear()
+            self.errors.clear()
+
+    def delay_and_fail(self, upstream: str) -> bool:
+        """Sleep for the upstream's latency; True if this call should fail"""
+        latency, jitter, error_rate = self.profiles[upstream]
+        time.sleep(max(0.0, random.gauss(latency, jitter)))
+        return random.random() < error_rate
+
+
+# ---------------------------------------------------------------------------
+# Canned upstream payloads
+# ---------------------------------------------------------------------------
+
+def flight_offers(query):
+    origin = query.get("originLocationCode", ["DEL"])[0]
+    destination = query.get("destinationLocationCode", ["BLR"])[0]
+    date = query.get("departureDate", ["2025-09-18"])[0]
+    count = int(query.get("max", ["5"])[0])
+    offers = []
+    for i in range(count):
+        hour = 6 + i * 3
+        offers.append({
+            "id": str(i + 1),
+            "itineraries": [{
+                "duration": "PT2H40M",
+                "segments": [{
+                    "carrierCode": random.choice(["AI", "6E", "UK", "SG"]),
+                    "number": str(random.randint(100, 999)),
+                    "departure": {"iataCode": origin, "at": f"{date}T{hour:02d}:00:00"},
+                    "arrival": {"iataCode": destination, "at": f"{date}T{hour + 2:02d}:40:00"},
+                }],
+            }],
+            "price": {"total": f"{random.randint(40, 180)}.00", "currency": "EUR"},
+        })
+    return {"data": offers}
+
+
+def pexels_photos(query):
+    q = query.get("query", ["travel"])[0]
+    per_page = int(query.get("per_page", ["3"])[0])
+    return {"photos": [{
+        "id": abs(hash((q, i))) % 10_000_000,
+        "width": 1920,
+        "height": 1280,
+        "photographer": "Simulator",
+        "alt": f"{q} #{i + 1}",
+        "src": {"medium": f"https://images.example.test/{q.replace(' ', '-')}/{i + 1}.jpg"},
+    } for i in range(per_page)]}
+
+
+def pexels_videos(query):
+    q = query.get("query", ["travel"])[0]
+    per_page = int(query.get("per_page", ["5"])[0])
+    return {"videos": [{
+        "id": abs(hash((q, "video", i))) % 10_000_000,
+        "duration": 12,
+        "image": f"https://images.example.test/{q.replace(' ', '-')}/poster-{i + 1}.jpg",
+        "user": {"name": "Simulator"},
+        "video_files": [{"quality": "hd", "width": 1280, "height": 720,
+                         "link": f"https://videos.example.test/{q.replace(' ', '-')}/{i + 1}.mp4"}],
+    } for i in range(per_page)]}
+
+
+def trains_between(query):
+    return {"trains": [{
+        "number": str(12000 + i),
+        "name": f"Simulated Express {i + 1}",
+        "dep_time": f"{8 + i * 4:02d}:15",
+        "arr_time": f"{(20 + i * 4) % 24:02d}:45",
+        "classes": [
+            {"code": "3A", "status": "AVAILABLE", "available": random.randint(0, 80), "wl": 0,
+             "fare": 1450, "confirm_prob": "HIGH"},
+            {"code": "SL", "status": "WL", "available": 0, "wl": random.randint(1, 60),
+             "fare": 560, "confirm_prob": "MEDIUM"},
+        ],
+    } for i in range(3)]}
+
+
+def fake_from_schema(schema, defs=None):
+    """Smallest value that satisfies a JSON schema"""
+    defs = defs if defs is not None else schema.get("$defs", schema.get("definitions", {}))
+    if "$ref" in schema:
+        return fake_from_schema(defs.get(schema["$ref"].split("/")[-1], {}), defs)
+    if "const" in schema:
+        return schema["const"]
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "default" in schema:
+        return schema["default"]
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            options = [s for s in schema[key] if s.get("type") != "null"] or schema[key]
+            return fake_from_schema(options[0], defs)
+
+    kind = schema.get("type", "object")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "null")
+    if kind == "object":
+        properties = schema.get("properties", {})
+        return {name: fake_from_schema(properties[name], defs) for name in schema.get("required", properties)}
+    if kind == "array":
+        return []
+    if kind in ("integer", "number"):
+        return 0
+    if kind == "boolean":
+        return False
+    if kind == "null":
+        return None
+    return "simulated"
+
+
+def chat_completion(body):
+    message = {"role": "assistant", "content": "Simulated response."}
+    finish_reason = "stop"
+
+    response_format = body.get("response_format") or {}
+    tools = body.get("tools") or []
+    if response_format.get("type") == "json_schema":
+        schema = response_format.get("json_schema", {}).get("schema", {})
+        message["content"] = json.dumps(fake_from_schema(schema))
+    elif response_format.get("type") == "json_object":
+        message["content"] = "{}"
+    elif tools:
+        function = tools[0].get("function", {})
+        message["content"] = None
+        message["tool_calls"] = [{
+            "id": f"call_{uuid.uuid4().hex[:12]}",
+            "type": "function",
+            "function": {
+                "name": function.get("name", "tool"),
+                "arguments": json.dumps(fake_from_schema(function.get("parameters", {}))),
+            },
+        }]
+        finish_reason = "tool_calls"
+
+    prompt_tokens = sum(len(str(m.get("content") or "")) for m in body.get("messages", [])) // 4
+    completion_tokens = len(str(message.get("content") or message.get("tool_calls"))) // 4
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "simulated"),
+        "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                  "total_tokens": prompt_tokens + completion_tokens},
+    }
+
+
+HANDLERS = {
+    "token": lambda query, body: {"access_token": uuid.uuid4().hex, "token_type": "Bearer", "expires_in": 1799},
+    "flight_offers": lambda query, body: flight_offers(query),
+    "photos": lambda query, body: pexels_photos(query),
+    "videos": lambda query, body: pexels_videos(query),
+    "trains": lambda query, body: trains_between(query),
+    "chat": lambda query, body: chat_completion(body),
+}
+
+
+def make_handler(sim: Simulator):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status, payload):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _handle(self, method):
+            parts = urlsplit(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            raw_body = self.rfile.read(length) if length else b""
+
+            if parts.path == "/__stats":
+                return self._send(200, sim.stats())
+            if parts.path == "/__reset":
+                sim.reset()
+                return self._send(200, {"status": "reset"})
+
+            route = ROUTES.get((method, parts.path))
+            if route is None:
+                return self._send(404, {"error": f"no simulated route for {method} {parts.path}"})
+
+            upstream, name = route
+            if sim.delay_and_fail(upstream):
+                sim.count(name, error=True)
+                return self._send(random.choice([429, 500, 503]), {"error": "simulated failure"})
+
+            sim.count(name)
+            query = parse_qs(parts.query)
+            body = {}
+            if raw_body and self.headers.get("Content-Type", "").startswith("application/json"):
+                body = json.loads(raw_body)
+            self._send(200, HANDLERS[name](query, body))
+
+        def do_GET(self):
+            self._handle("GET")
+
+        def do_POST(self):
+            self._handle("POST")
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def parse_profiles(values):
+    profiles = dict(DEFAULT_PROFILES)
+    for value in values or []:
+        name, _, spec = value.partition("=")
+        if name not in profiles:
+            raise SystemExit(f"Unknown upstream '{name}', expected one of {sorted(profiles)}")
+        latency, jitter, error_rate = (float(x) for x in spec.split(":"))
+        profiles[name] = (latency, jitter, error_rate)
+    return profiles
+
+
+def start(port: int = 0, profiles=None):
+    """Start the simulator in a background thread; returns (server, simulator)"""
+    sim = Simulator(profiles or dict(DEFAULT_PROFILES))
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(sim))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, sim
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--profile", action="append", metavar="NAME=LATENCY:JITTER:ERROR_RATE")
+    args = parser.parse_args()
+
+    server, sim = start(args.port, parse_profiles(args.profile))
+    print(f"Upstream simulator listening on http://127.0.0.1:{server.server_port}")
+    for name, (latency, jitter, error_rate) in sim.profiles.items():
+        print(f"  {name:<10} latency {latency:.2f}s  jitter {jitter:.2f}s  errors {error_rate:.0%}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
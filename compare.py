@@ -0,0 +1,221 @@
+"""Flight vs train comparison for one city pair and date, without the LLM.
+
+Both ends are looked up once in the location index to get an airport and a
+railway station, AmadeusScheduleTool and RailRadarSearchTool are queried
+concurrently under their own deadlines, and the results are merged into one list
+ranked by duration, price and seat availability. A slow or failing source only
+costs its own half of the list.
+"""
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from app import FlightSearchResults
+from deadlines import RequestBudget, abandon, deadline_context
+from direct import _result_by
+from tools.amadeus_tool import AmadeusScheduleTool, FlightOffer
+from tools.locations import codes_for
+from tools.railradar_tool import RailRadarSearchTool, TrainInfo
+
+# Amadeus quotes in EUR by default; asking for rupees puts fares on RailRadar's scale
+COMPARE_CURRENCY = os.getenv("COMPARE_CURRENCY", "INR")
+
+SORT_ORDERS = ("balanced", "duration", "price")
+
+_ISO_DURATION = re.compile(r"P(?:(\d+)D)?T?(?:(\d+)H)?(?:(\d+)M)?")
+
+
+class TravelOption(BaseModel):
+    mode: str  # "flight" or "train"
+    name: Optional[str] = None
+    number: Optional[str] = None
+    departure_time: Optional[str] = None
+    arrival_time: Optional[str] = None
+    duration_minutes: Optional[int] = None
+    price: Optional[float] = None
+    currency: Optional[str] = None
+    travel_class: Optional[str] = None
+    seats_available: Optional[int] = None  # None when the source doesn't report seats
+    waiting_list: Optional[int] = None
+    available: bool = True
+    stops: Optional[int] = None
+    score: Optional[float] = None
+
+
+class TrainSearchResults(BaseModel):
+    trains: List[TrainInfo] = []
+    search_date: Optional[str] = None
+    source: Optional[str] = None
+    destination: Optional[str] = None
+    total_results: int = 0
+    error: Optional[str] = None
+
+
+def search_trains(rail_tool: RailRadarSearchTool, source: str, destination: str,
+                  journey_date: str) -> TrainSearchResults:
+    results = TrainSearchResults(search_date=journey_date, source=source, destination=destination)
+    try:
+        results.trains = rail_tool.run(None, origin=source, destination=destination, journey_date=journey_date)
+        results.total_results = len(results.trains)
+    except Exception as e:
+        results.error = f"Failed to invoke RailRadar API: {e}"
+    return results
+
+
+def search_flights_priced(flight_tool: AmadeusScheduleTool, source: str, destination: str,
+                          journey_date: str) -> FlightSearchResults:
+    results = FlightSearchResults(search_date=journey_date, source=source, destination=destination)
+    try:
+        results.flights = flight_tool.search_flights(source, destination, journey_date, currency=COMPARE_CURRENCY)
+        results.total_results = len(results.flights)
+    except Exception as e:
+        results.error = f"Failed to invoke Amadeus API: {e}"
+    return results
+
+
+def _price(value: Any) -> Optional[float]:
+    try:
+        return float(str(value).replace(",", "").lstrip("₹"))
+    except (TypeError, ValueError):
+        return None
+
+
+def iso_duration_minutes(duration: Optional[str]) -> Optional[int]:
+    """Minutes in an ISO 8601 duration: "PT2H15M" -> 135"""
+    match = _ISO_DURATION.fullmatch(duration or "")
+    if not match or not any(match.groups()):
+        return None
+    days, hours, minutes = (int(part or 0) for part in match.groups())
+    return days * 1440 + hours * 60 + minutes
+
+
+def clock_duration_minutes(departure: str, arrival: str) -> Optional[int]:
+    """Minutes between "HH:MM" times, assuming an arrival before departure is the next day.
+
+    RailRadar reports clock times only, so journeys over 24 hours come out short.
+    """
+    try:
+        dep_h, dep_m = map(int, departure.split(":")[:2])
+        arr_h, arr_m = map(int, arrival.split(":")[:2])
+    except (AttributeError, ValueError):
+        return None
+    return (arr_h * 60 + arr_m - dep_h * 60 - dep_m) % 1440
+
+
+def flight_options(flights: List[FlightOffer]) -> List[TravelOption]:
+    return [
+        TravelOption(
+            mode="flight",
+            name=flight.airline,
+            number=flight.flight_number,
+            departure_time=flight.departure_time,
+            arrival_time=flight.arrival_time,
+            duration_minutes=iso_duration_minutes(flight.duration),
+            price=_price(flight.price),
+            currency=flight.currency,
+            stops=flight.stops,
+        )
+        for flight in flights
+    ]
+
+
+def train_options(trains: List[TrainInfo]) -> List[TravelOption]:
+    """One option per train, for its cheapest class with seats (or its cheapest class if none have)"""
+    options = []
+    for train in trains:
+        coaches = sorted(train.coaches, key=lambda c: (c.available_seats <= 0, _price(c.fare) is None,
+                                                       _price(c.fare) or 0))
+        coach = coaches[0] if coaches else None
+        options.append(TravelOption(
+            mode="train",
+            name=train.train_name,
+            number=train.train_number,
+            departure_time=train.departure_time,
+            arrival_time=train.arrival_time,
+            duration_minutes=clock_duration_minutes(train.departure_time, train.arrival_time),
+            price=_price(coach.fare) if coach else None,
+            currency="INR" if coach and _price(coach.fare) is not None else None,
+            travel_class=coach.class_code if coach else None,
+            seats_available=coach.available_seats if coach else 0,
+            waiting_list=coach.waiting_list if coach else None,
+            available=bool(coach and coach.available_seats > 0),
+        ))
+    return options
+
+
+def rank_options(options: List[TravelOption], sort: str = "balanced") -> List[TravelOption]:
+    """Bookable options first, then by `sort`.
+
+    "balanced" scores each option as duration / fastest + price / cheapest, so 2.0
+    is an option that is both the fastest and the cheapest; a missing duration or
+    price counts as twice the best.
+    """
+    if sort not in SORT_ORDERS:
+        raise ValueError(f"sort must be one of {', '.join(SORT_ORDERS)}")
+
+    # Measure against what can actually be booked, so a cheap sold-out train doesn't skew every score
+    reference = [o for o in options if o.available] or options
+    durations = [o.duration_minutes for o in reference if o.duration_minutes]
+    prices = [o.price for o in reference if o.price]
+    fastest = min(durations) if durations else None
+    cheapest = min(prices) if prices else None
+    for option in options:
+        duration_ratio = option.duration_minutes / fastest if fastest and option.duration_minutes else 2.0
+        price_ratio = option.price / cheapest if cheapest and option.price else 2.0
+        option.score = round(duration_ratio + price_ratio, 3)
+
+    infinity = float("inf")
+    keys = {
+        "balanced": lambda o: (o.score,),
+        "duration": lambda o: (o.duration_minutes or infinity, o.price or infinity),
+        "price": lambda o: (o.price or infinity, o.duration_minutes or infinity),
+    }
+    return sorted(options, key=lambda o: (not o.available, *keys[sort](o)))
+
+
+def compare_modes(flight_tool: AmadeusScheduleTool, rail_tool: RailRadarSearchTool, source: str,
+                  destination: str, journey_date: str, sort: str = "balanced",
+                  budget: Optional[RequestBudget] = None) -> Dict[str, Any]:
+    """Search flights and trains concurrently and return one ranked list of options"""
+    if sort not in SORT_ORDERS:
+        raise ValueError(f"sort must be one of {', '.join(SORT_ORDERS)}")
+
+    budget = budget or RequestBudget()
+    source_airport, source_station, source_city = codes_for(source)
+    destination_airport, destination_station, destination_city = codes_for(destination)
+
+    flights_timeout = budget.timeout_for(flight_tool.id)
+    trains_timeout = budget.timeout_for(rail_tool.id)
+    start = time.monotonic()
+
+    executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        flights_future = executor.submit(deadline_context("flights", flights_timeout).run, search_flights_priced,
+                                         flight_tool, source_airport, destination_airport, journey_date)
+        trains_future = executor.submit(deadline_context("trains", trains_timeout).run, search_trains,
+                                        rail_tool, source_station, destination_station, journey_date)
+        flights = _result_by(flights_future, start + flights_timeout, flights_timeout, "flights",
+                             FlightSearchResults(search_date=journey_date, source=source_airport,
+                                                 destination=destination_airport))
+        trains = _result_by(trains_future, start + trains_timeout, trains_timeout, "trains",
+                            TrainSearchResults(search_date=journey_date, source=source_station,
+                                               destination=destination_station))
+    finally:
+        abandon(executor)
+
+    options = rank_options(flight_options(flights.flights) + train_options(trains.trains), sort)
+    errors = {name: r.error for name, r in (("flights", flights), ("trains", trains)) if r.error}
+    return {
+        "source": {"city": source_city, "airport": source_airport, "station": source_station},
+        "destination": {"city": destination_city, "airport": destination_airport, "station": destination_station},
+        "journey_date": journey_date,
+        "sort": sort,
+        "options": [option.model_dump() for option in options],
+        "counts": {"flights": len(flights.flights), "trains": len(trains.trains)},
+        "errors": errors,
+        "timings": {"total": round(time.monotonic() - start, 3)},
+    }
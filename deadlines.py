@@ -0,0 +1,129 @@
+import contextvars
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+# Whole-request latency budget (seconds) and the most any single tool step may take
+REQUEST_BUDGET = float(os.getenv("TRAVEL_AGENT_REQUEST_BUDGET", "90"))
+
+TOOL_DEADLINES: Dict[str, float] = {
+    tool_id: float(os.getenv(f"TRAVEL_AGENT_DEADLINE_{tool_id.upper()}", default))
+    for tool_id, default in (
+        ("search_tool", "45"),
+        ("amadeus_schedule", "20"),
+        ("pexels_search", "10"),
+        ("railradar_search", "15"),
+        ("llm_tool", "60"),
+    )
+}
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a step doesn't finish before its deadline"""
+
+    def __init__(self, name: str, timeout: float):
+        super().__init__(f"{name} timed out after {timeout:.1f}s")
+        self.name = name
+        self.timeout = timeout
+
+
+# (monotonic deadline, step name, timeout) of the innermost step running in this context
+_current_deadline: contextvars.ContextVar[Optional[Tuple[float, str, float]]] = contextvars.ContextVar(
+    "travel_agent_deadline", default=None)
+
+# Told about each step abandoned in this context while it is still running (see AgentPool)
+_abandon_listener: contextvars.ContextVar[Optional[Callable[[Future], None]]] = contextvars.ContextVar(
+    "travel_agent_abandon_listener", default=None)
+
+
+class RequestBudget:
+    """Latency budget for one request.
+
+    A step gets its tool's deadline, cut short by whatever is left of the budget,
+    so late steps are abandoned and the response is built from the sections that
+    finished in time.
+    """
+
+    def __init__(self, total: Optional[float] = None):
+        self.total = REQUEST_BUDGET if total is None else total
+        self.started = time.monotonic()
+
+    def remaining(self) -> float:
+        return max(0.0, self.started + self.total - time.monotonic())
+
+    def timeout_for(self, tool_id: str) -> float:
+        """Seconds a step using `tool_id` may run if it starts now"""
+        return min(self.remaining(), TOOL_DEADLINES.get(tool_id, self.total))
+
+    def remaining_after(self, *tool_ids: str) -> float:
+        """Seconds a step may run while leaving time for steps using `tool_ids`, run
+        concurrently, to follow it; at most half of what remains is held back"""
+        reserve = max((TOOL_DEADLINES.get(tool_id, 0.0) for tool_id in tool_ids), default=0.0)
+        return self.remaining() - min(reserve, self.remaining() / 2)
+
+
+def abandon(executor: ThreadPoolExecutor) -> None:
+    """Shut an executor down without waiting for late steps.
+
+    Python threads can't be interrupted: queued steps are cancelled, running ones
+    finish in the background and their results are dropped.
+    """
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def deadline_context(name: str, timeout: float) -> contextvars.Context:
+    """A copy of the current context carrying a deadline `timeout` seconds from now.
+
+    Upstream HTTP calls and LLM calls made in it check the deadline (see
+    check_deadline), so a step that is abandoned stops at its next call instead of
+    running to completion. An earlier deadline already in the context is kept.
+    """
+    context = contextvars.copy_context()
+    deadline = time.monotonic() + timeout
+    current = context.get(_current_deadline)
+    if current is None or deadline < current[0]:
+        context.run(_current_deadline.set, (deadline, name, timeout))
+    return context
+
+
+def time_left() -> Optional[float]:
+    """Seconds until the current step's deadline, or None outside deadline_context()"""
+    current = _current_deadline.get()
+    return None if current is None else current[0] - time.monotonic()
+
+
+def check_deadline() -> None:
+    """Raise DeadlineExceeded if the current step's deadline has passed"""
+    current = _current_deadline.get()
+    if current is not None and current[0] <= time.monotonic():
+        raise DeadlineExceeded(current[1], current[2])
+
+
+def on_abandoned(listener: Callable[[Future], None]) -> None:
+    """Have `listener` called with the future of every step abandoned from the current context"""
+    _abandon_listener.set(listener)
+
+
+def track_abandoned(future: Future) -> None:
+    """Report a timed-out step that is still running to the context's listener, if any"""
+    listener = _abandon_listener.get()
+    if listener is not None:
+        listener(future)
+
+
+def call_with_deadline(name: str, timeout: float, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run `fn` on its own thread and raise DeadlineExceeded if it is still running after `timeout`"""
+    if timeout <= 0:
+        raise DeadlineExceeded(name, 0.0)
+
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="deadline")
+    future: Future = executor.submit(deadline_context(name, timeout).run, fn, *args, **kwargs)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeout:
+        track_abandoned(future)
+        raise DeadlineExceeded(name, timeout) from None
+    finally:
+        abandon(executor)
@@ -0,0 +1,69 @@
+"""Deterministic tool-only searches that skip the LLM.
+
+Flights and images don't need any reasoning, so in "direct" mode they come straight
+from AmadeusScheduleTool and PexelsSearchTool as typed FlightOffer/ImageResult
+objects, in parallel with the agent run that writes the overview and attractions.
+"""
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Optional, Tuple
+
+from app import FlightSearchResults, ImageSearchResults
+from deadlines import DeadlineExceeded, RequestBudget, abandon, deadline_context
+from tools.amadeus_tool import AmadeusScheduleTool
+from tools.pexels_tool import PexelsSearchTool
+
+
+def search_flights(flight_tool: AmadeusScheduleTool, source: str, destination: str,
+                   journey_date: str) -> FlightSearchResults:
+    results = FlightSearchResults(search_date=journey_date, source=source, destination=destination)
+    try:
+        results.flights = flight_tool.search_flights(source, destination, journey_date)
+        results.total_results = len(results.flights)
+    except Exception as e:
+        results.error = f"Failed to invoke Amadeus API: {e}"
+    return results
+
+
+def search_images(pexels_tool: PexelsSearchTool, query: str, per_page: int = 6) -> ImageSearchResults:
+    results = ImageSearchResults(query=query)
+    try:
+        results.images = pexels_tool.search_images(query, per_page=per_page)
+        results.total_images = len(results.images)
+    except Exception as e:
+        results.error = f"Failed to invoke Pexels API: {e}"
+    return results
+
+
+def _result_by(future: Future, deadline: float, timeout: float, name: str, late_result):
+    """The future's result, or `late_result` with a timeout error once `deadline` has passed"""
+    try:
+        return future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except FutureTimeout:
+        late_result.error = str(DeadlineExceeded(name, timeout))
+        return late_result
+
+
+def run_direct_searches(flight_tool: AmadeusScheduleTool, pexels_tool: PexelsSearchTool, source: str,
+                        destination: str, journey_date: str, image_query: str,
+                        budget: Optional[RequestBudget] = None) -> Tuple[FlightSearchResults, ImageSearchResults]:
+    """Run the flight and image searches concurrently, each bounded by its tool deadline"""
+    budget = budget or RequestBudget()
+    flights_timeout = budget.timeout_for(flight_tool.id)
+    images_timeout = budget.timeout_for(pexels_tool.id)
+    start = time.monotonic()
+
+    executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        flights = executor.submit(deadline_context("flights", flights_timeout).run, search_flights,
+                                  flight_tool, source, destination, journey_date)
+        images = executor.submit(deadline_context("images", images_timeout).run, search_images,
+                                 pexels_tool, image_query)
+        return (
+            _result_by(flights, start + flights_timeout, flights_timeout, "flights",
+                       FlightSearchResults(search_date=journey_date, source=source, destination=destination)),
+            _result_by(images, start + images_timeout, images_timeout, "images",
+                       ImageSearchResults(query=image_query)),
+        )
+    finally:
+        abandon(executor)
@@ -125,6 +125,15 @@ const indianCities = [
       ).slice(0,12);
       currentMatches = matches;
       renderList(matches, q);
+      // the backend index also knows aliases and forgives typos ("bangalore", "bengaluur")
+      fetch(`${API_BASE}/locations/suggest?${new URLSearchParams({q, kind: 'airport', limit: 12})}`)
+        .then(res => res.ok ? res.json() : null)
+        .then(data => {
+          if(!data || !data.suggestions.length || inputEl.value.trim().toLowerCase() !== q) return;
+          currentMatches = data.suggestions;
+          renderList(currentMatches, q);
+        })
+        .catch(() => {});
     });
   
     // keyboard nav
@@ -156,8 +165,10 @@ const indianCities = [
 
 
 
+const API_BASE = "http://127.0.0.1:8000";
+
 async function fetchTravelGuide(payload) {
-  const res = await fetch("http://127.0.0.1:8000/travel-guide", {
+  const res = await fetch(`${API_BASE}/travel-guide`, {
     method: "POST",
     headers: { "Content-Type": "application/json" },
     body: JSON.stringify(payload),
@@ -166,6 +177,42 @@ async function fetchTravelGuide(payload) {
   return parseApiResult(data);
 }
 
+// Stream sections from /travel-guide/stream; handlers[section](data) is called per event.
+// Resolves on "complete", rejects if the stream breaks before that.
+function streamTravelGuide(payload, handlers) {
+  return new Promise((resolve, reject) => {
+    const es = new EventSource(`${API_BASE}/travel-guide/stream?${new URLSearchParams(payload)}`);
+    ['overview','weather','attractions','flights','images','summary'].forEach(section => {
+      es.addEventListener(section, ev => {
+        const msg = JSON.parse(ev.data);
+        if(handlers[section]) handlers[section](msg.data);
+      });
+    });
+    es.addEventListener('complete', ev => { es.close(); resolve(JSON.parse(ev.data)); });
+    es.onerror = err => { es.close(); reject(err); };
+  });
+}
+
+  function flightsFromData(data){
+    if(Array.isArray(data)) return data;
+    // Amadeus text format: "1. AI2995" followed by Departure/Arrival/Price lines
+    const flights = [];
+    (typeof data === 'string' ? data : '').split('\n').forEach(line => {
+      const t = line.trim(); let m;
+      if((m = t.match(/^\d+\.\s+([A-Z0-9]{2})(\d+)$/))) flights.push({airline:m[1], flight_no:m[1]+m[2]});
+      else if(!flights.length) return;
+      else if((m = t.match(/^Departure:\s*(.*)$/))) flights[flights.length-1].depart = m[1];
+      else if((m = t.match(/^Arrival:\s*(.*)$/))) flights[flights.length-1].arrive = m[1];
+      else if((m = t.match(/^Price:\s*(.*)$/))) flights[flights.length-1].price = m[1];
+    });
+    return flights;
+  }
+
+  function imagesFromData(data){
+    if(Array.isArray(data)) return data.map(i => typeof i === 'string' ? i : (i.proxy_url ? `${API_BASE}${i.proxy_url}?w=640` : i.url)).filter(Boolean);
+    return (typeof data === 'string' ? data : '').match(/https?:\/\/[^\s)"']+/g) || [];
+  }
+
   
   
   function normalizeFromText(d){
@@ -205,9 +252,9 @@ async function fetchTravelGuide(payload) {
     if(!flights || !flights.length){ tb.innerHTML = '<tr><td colspan="6" class="small" style="color:var(--muted)">No flights found for the selected date.</td></tr>'; return; }
     flights.forEach(f=>{
       const tr = document.createElement('tr');
-      tr.innerHTML = `<td>${esc(f.airline||'')}</td><td>${esc(f.flight_no||f.flight||'')}</td>
+      tr.innerHTML = `<td>${esc(f.airline||'')}</td><td>${esc(f.flight_no||f.flight_number||f.flight||'')}</td>
         <td>${esc(f.depart||f.departure_time||'')}</td><td>${esc(f.arrive||f.arrival_time||'')}</td>
-        <td>${esc(f.duration||'')}</td><td class="price">${esc(f.price||f.fare||'')}</td>`;
+        <td>${esc(f.duration||'')}</td><td class="price">${esc([f.price||f.fare, f.currency].filter(Boolean).join(' '))}</td>`;
       tb.appendChild(tr);
     });
   }
@@ -299,30 +346,35 @@ async function fetchTravelGuide(payload) {
     const sourceCode = codeFrom(srcInput), destinationCode = codeFrom(dstInput);
     if(!sourceCode || !destinationCode || !date){ toast('Please select source, destination and date.', true); return; }
   
-    // show loading
+    const payload = {source: sourceCode, destination: destinationCode, journey_date: date};
+
+    // show loading until the first section arrives
     $('#loading').style.display = 'flex';
+    const reveal = () => {
+      $('#loading').style.display = 'none';
+      ['#highlightsSec','#nearbySec','#flightsSec','#gallerySec'].forEach(id => $(id).classList.add('revealed'));
+    };
     try{
-      const res = await fetchTravelGuide({
-        source: sourceCode,
-        destination: destinationCode,
-        journey_date: date
-    });
-    
-    // reveal sections
-    ['#highlightsSec','#nearbySec','#flightsSec','#gallerySec'].forEach(id => $(id).classList.add('revealed'));
-    
-    console.log("API raw response:", res);
-    
-    const parsed = parseApiResult(
-      
-    );
-    
-    renderHighlights(parsed.info);
-    renderNearby(parsed.nearby);
-    renderFlights(parsed.flights);
-    renderGallery(parsed.images);
-    
-
+      const info = {overview: '', weather: ''};
+      const renderInfo = () => renderHighlights([info.overview, info.weather].filter(Boolean).join('\n\n'));
+      try{
+        await streamTravelGuide(payload, {
+          overview: d => { reveal(); info.overview = typeof d === 'string' ? d : JSON.stringify(d); renderInfo(); },
+          weather: d => { reveal(); info.weather = typeof d === 'string' ? d : JSON.stringify(d); renderInfo(); },
+          attractions: d => { reveal(); renderNearby(Array.isArray(d) ? d.map(p => p.name || p) : normalizeFromText({text: d}).nearby); },
+          flights: d => { reveal(); renderFlights(flightsFromData(d)); },
+          images: d => { reveal(); renderGallery(imagesFromData(d)); },
+        });
+      }catch(streamErr){
+        // fall back to the one-shot endpoint
+        console.warn('Streaming failed, falling back to /travel-guide', streamErr);
+        const parsed = await fetchTravelGuide(payload);
+        reveal();
+        renderHighlights(parsed.info);
+        renderNearby(parsed.nearby);
+        renderFlights(parsed.flights);
+        renderGallery(parsed.images);
+      }
 
       confetti({particleCount:120,startVelocity:30,spread:70,origin:{y:.15}});
       toast('Plan generated!');
@@ -0,0 +1,68 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from tools import metrics
+from tools.response_cache import TTLCache, normalize_query
+
+
+# Overview, attractions and images barely change; flights and weather go stale fast
+VOLATILE_SECTIONS = ("weather", "flights")
+
+FRESH = "HIT"
+STALE = "STALE"
+MISS = "MISS"
+
+
+class GuideCache:
+    """Whole-response cache for /travel-guide with stale-while-revalidate.
+
+    An entry is fresh for `volatile_ttl`, the age at which its flights and weather
+    can no longer be trusted. After that it is served as stale while the whole guide
+    is regenerated in the background (the agent writes every section in one run),
+    until `static_ttl` passes and it is dropped.
+    """
+
+    def __init__(self, static_ttl: float, volatile_ttl: float, maxsize: int = 256):
+        self.static_ttl = static_ttl
+        self.volatile_ttl = min(volatile_ttl, static_ttl)
+        self._entries = TTLCache(ttl=static_ttl, maxsize=maxsize)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(source: str, destination: str, journey_date: Any) -> str:
+        return "|".join([normalize_query(source).upper(), normalize_query(destination).upper(), str(journey_date).strip()])
+
+    def lookup(self, key: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            state, result = MISS, None
+        else:
+            stored_at, result = entry
+            state = FRESH if time.time() - stored_at < self.volatile_ttl else STALE
+        metrics.CACHE_LOOKUPS.inc(cache="travel_guide", result=state.lower())
+        return result, state
+
+    def store(self, key: str, result: Dict[str, Any]) -> None:
+        self._entries.set(key, (time.time(), result))
+
+    def begin_refresh(self, key: str) -> bool:
+        """Claim the background refresh for `key`; False if one is already running"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key: str) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+
+guide_cache = GuideCache(
+    static_ttl=float(os.getenv("GUIDE_CACHE_STATIC_TTL", "21600")),
+    volatile_ttl=float(os.getenv("GUIDE_CACHE_VOLATILE_TTL", "600")),
+    maxsize=int(os.getenv("GUIDE_CACHE_SIZE", "256")),
+)
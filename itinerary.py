@@ -0,0 +1,134 @@
+"""Multi-destination itineraries (A→B→C→A) planned in one concurrent fan-out.
+
+Every distinct destination gets one set of overview, weather and attractions
+steps plus one image search, however many legs visit it; the trip's starting
+city gets none. Flights are searched once per distinct (source, destination,
+date) leg straight from AmadeusScheduleTool, without the LLM.
+"""
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Dict, List, Optional
+
+from app import AgentContext, ImageSearchResults, _as_plain, _output_value, run_fanout_steps
+from deadlines import RequestBudget, abandon
+from direct import search_flights, search_images
+from tools.locations import AIRPORT, city_name
+from tools.response_cache import normalize_query
+
+ITINERARY_MAX_LEGS = int(os.getenv("ITINERARY_MAX_LEGS", "8"))
+
+# Agent steps run once per destination; flights and images come from the tools directly
+CITY_STEPS = ["$destination_info", "$weather", "$places_to_visit"]
+
+
+def city_key(name: str) -> str:
+    return normalize_query(name)
+
+
+def plan_city(context: AgentContext, city: str, budget: RequestBudget) -> Dict[str, Any]:
+    """Overview, weather, attractions and images for one destination"""
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        images = executor.submit(contextvars.copy_context().run, search_images, context.pexels_tool, city)
+        step_outputs, timings, errors = run_fanout_steps(
+            context, {"destination_city_name": city}, budget=budget, steps=CITY_STEPS)
+        try:
+            images = images.result(timeout=budget.timeout_for(context.pexels_tool.id))
+        except FutureTimeout:
+            images = ImageSearchResults(query=city, error="Image search timed out")
+    finally:
+        abandon(executor)
+
+    if images.error:
+        errors["destination_images"] = images.error
+
+    def section(output_name: str):
+        return _as_plain(_output_value(step_outputs.get(output_name)))
+
+    return {
+        "city_name": city,
+        "destination_info": section("$destination_info"),
+        "weather": section("$weather"),
+        "places_to_visit": section("$places_to_visit"),
+        "images": [image.model_dump() for image in images.images],
+        "errors": errors,
+        "timings": timings,
+    }
+
+
+def plan_itinerary(context: AgentContext, legs: List[Dict[str, str]],
+                   budget: Optional[RequestBudget] = None) -> Dict[str, Any]:
+    """Plan every leg and destination of a trip concurrently.
+
+    `legs` are dicts with source, destination and journey_date (TravelRequest
+    fields), in travel order.
+    """
+    if not legs:
+        raise ValueError("An itinerary needs at least one leg")
+    if len(legs) > ITINERARY_MAX_LEGS:
+        raise ValueError(f"An itinerary can have at most {ITINERARY_MAX_LEGS} legs")
+
+    budget = budget or RequestBudget()
+    start = time.perf_counter()
+    home = city_key(legs[0]["source"])
+
+    cities: Dict[str, str] = {}
+    for leg in legs:
+        key = city_key(leg["destination"])
+        if key != home:
+            # Legs carry airport codes; the agent steps and image search want the city
+            cities.setdefault(key, city_name(leg["destination"], AIRPORT))
+
+    flight_keys = {}
+    for leg in legs:
+        flight_keys.setdefault((leg["source"].upper(), leg["destination"].upper(), leg["journey_date"]), None)
+
+    executor = ThreadPoolExecutor(max_workers=len(cities) + len(flight_keys))
+    try:
+        city_futures = {
+            key: executor.submit(contextvars.copy_context().run, plan_city, context, name, budget)
+            for key, name in cities.items()
+        }
+        flight_futures = {
+            key: executor.submit(contextvars.copy_context().run, search_flights, context.flight_tool, *key)
+            for key in flight_keys
+        }
+
+        destinations = {}
+        for key, future in city_futures.items():
+            try:
+                destinations[key] = future.result(timeout=budget.remaining())
+            except FutureTimeout:
+                destinations[key] = {"city_name": cities[key], "errors": {"city": "Request budget exhausted"}}
+            except Exception as e:
+                destinations[key] = {"city_name": cities[key], "errors": {"city": str(e)}}
+
+        flights = {}
+        for key, future in flight_futures.items():
+            try:
+                flights[key] = future.result(timeout=budget.timeout_for(context.flight_tool.id)).model_dump()
+            except FutureTimeout:
+                flights[key] = {"flights": [], "source": key[0], "destination": key[1], "search_date": key[2],
+                                "total_results": 0, "error": "Flight search timed out"}
+    finally:
+        abandon(executor)
+
+    leg_results = []
+    for leg in legs:
+        key = (leg["source"].upper(), leg["destination"].upper(), leg["journey_date"])
+        leg_results.append({**leg, "flights": flights[key], "destination_key": city_key(leg["destination"])})
+
+    failed = any(d.get("errors") for d in destinations.values()) or any(f.get("error") for f in flights.values())
+    return {
+        "legs": leg_results,
+        "destinations": destinations,
+        "status": "PARTIAL_SUCCESS" if failed else "SUCCESS",
+        "stats": {
+            "legs": len(legs),
+            "destinations_planned": len(cities),
+            "flight_searches": len(flight_keys),
+        },
+        "timings": {"total": round(time.perf_counter() - start, 3)},
+    }
@@ -0,0 +1,158 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from agent_pool import AgentPool
+
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class Job:
+    def __init__(self, job_id: str, params: Dict[str, Any], steps: List[str]):
+        self.id = job_id
+        self.params = params
+        self.status = QUEUED
+        self.steps: Dict[str, Dict[str, Any]] = {name: {"status": "pending", "elapsed": None} for name in steps}
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        done = sum(1 for step in self.steps.values() if step["status"] == "done")
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "params": self.params,
+            "progress": {"completed_steps": done, "total_steps": len(self.steps), "steps": self.steps},
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobStore:
+    """Bounded in-memory job store.
+
+    Finished jobs are kept for `max_age` seconds (an expired job is never served,
+    even before it is swept); when more than `max_jobs` are held, the oldest
+    finished jobs are evicted first.
+    """
+
+    def __init__(self, max_jobs: int = 1000, max_age: float = 3600):
+        self.max_jobs = max_jobs
+        self.max_age = max_age
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expired(self, job: Job, now: float) -> bool:
+        return job.finished and job.finished_at < now - self.max_age
+
+    def _drop_expired(self) -> None:
+        now = time.time()
+        for job_id in [j.id for j in self._jobs.values() if self._expired(j, now)]:
+            del self._jobs[job_id]
+
+    def _evict(self) -> None:
+        self._drop_expired()
+
+        if len(self._jobs) >= self.max_jobs:
+            for job_id in [j.id for j in self._jobs.values() if j.finished]:
+                del self._jobs[job_id]
+                if len(self._jobs) < self.max_jobs:
+                    break
+
+    def create(self, params: Dict[str, Any], steps: List[str]) -> Job:
+        job = Job(uuid.uuid4().hex, params, steps)
+        with self._lock:
+            self._evict()
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and self._expired(job, time.time()):
+                del self._jobs[job_id]
+                return None
+            return job
+
+    def discard(self, job_id: str) -> None:
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            self._drop_expired()
+            counts = {QUEUED: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        return counts
+
+
+class JobRunner:
+    """Runs jobs on their own bounded pool so they can't starve interactive requests"""
+
+    def __init__(self, store: JobStore, pool: AgentPool):
+        self.store = store
+        self.pool = pool
+
+    def submit(self, params: Dict[str, Any], steps: List[str],
+               fn: Callable[..., Dict[str, Any]]) -> Job:
+        """Queue `fn(on_step=...)`; raises PoolSaturated if the job pool is full"""
+        job = self.store.create(params, steps)
+
+        def on_step(step: str, value: Any, elapsed: Optional[float]) -> None:
+            job.steps[step] = {"status": "done", "elapsed": elapsed}
+
+        def run() -> None:
+            job.status = RUNNING
+            job.started_at = time.time()
+            try:
+                job.result = fn(on_step=on_step)
+                # run_travel_planning_agent reports its own failures instead of raising
+                if job.result.get("status") == "ERROR":
+                    job.error = job.result.get("summary") or "Travel planning failed"
+                    status = FAILED
+                else:
+                    status = SUCCEEDED
+            except Exception as e:
+                job.error = str(e)
+                status = FAILED
+            # finished_at must be set before the status flips to a finished state
+            job.finished_at = time.time()
+            job.status = status
+
+        try:
+            self.pool.submit(run)
+        except Exception:
+            self.store.discard(job.id)
+            raise
+        return job
+
+
+job_runner = JobRunner(
+    store=JobStore(
+        max_jobs=int(os.getenv("JOB_STORE_SIZE", "1000")),
+        max_age=float(os.getenv("JOB_RESULT_TTL", "3600")),
+    ),
+    pool=AgentPool(
+        max_workers=int(os.getenv("JOB_POOL_WORKERS", "2")),
+        max_queue=int(os.getenv("JOB_POOL_QUEUE", "32")),
+        retry_after=int(os.getenv("AGENT_POOL_RETRY_AFTER", "10")),
+    ),
+)
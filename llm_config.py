@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from portia import Config, LLMProvider
+
+import deadlines
+from tools import metrics
+
+
+_llm_metrics_installed = False
+_llm_deadlines_installed = False
+_llm_metrics_lock = threading.Lock()
+
+
+def install_llm_metrics() -> None:
+    """Time every LangChain chat model call and count its tokens.
+
+    Portia's execution agents call the model through LangChain, so a global
+    callback handler sees those calls without touching Portia. Planning calls that
+    bypass LangChain are only covered by the step timings in app.py.
+    """
+    global _llm_metrics_installed
+
+    try:
+        from langchain_core.callbacks import BaseCallbackHandler
+        from langchain_core.tracers.context import register_configure_hook
+    except ImportError:
+        return
+
+    with _llm_metrics_lock:
+        if _llm_metrics_installed:
+            return
+        _llm_metrics_installed = True
+
+    class LLMMetricsHandler(BaseCallbackHandler):
+        def __init__(self):
+            self._started = {}
+
+        def _start(self, serialized, run_id, kwargs):
+            model = (kwargs.get("invocation_params") or {}).get("model") \
+                or (kwargs.get("invocation_params") or {}).get("model_name") \
+                or (serialized or {}).get("name", "unknown")
+            self._started[run_id] = (time.perf_counter(), model)
+
+        def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+            self._start(serialized, run_id, kwargs)
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+            self._start(serialized, run_id, kwargs)
+
+        def _finish(self, run_id, outcome):
+            start, model = self._started.pop(run_id, (None, "unknown"))
+            if start is not None:
+                elapsed = time.perf_counter() - start
+                metrics.LLM_DURATION.observe(elapsed, model=model, outcome=outcome)
+                metrics.record_span("llm", elapsed, model=model, outcome=outcome)
+            return model
+
+        def on_llm_end(self, response, *, run_id, **kwargs):
+            model = self._finish(run_id, "ok")
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            prompt_tokens = usage.get("prompt_tokens", 0)
+            completion_tokens = usage.get("completion_tokens", 0)
+            if not usage:
+                # Gemini and newer LangChain models report usage on the message instead
+                for generations in response.generations:
+                    for generation in generations:
+                        message_usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                        prompt_tokens += message_usage.get("input_tokens", 0)
+                        completion_tokens += message_usage.get("output_tokens", 0)
+            if prompt_tokens:
+                metrics.LLM_TOKENS.inc(prompt_tokens, model=model, kind="prompt")
+            if completion_tokens:
+                metrics.LLM_TOKENS.inc(completion_tokens, model=model, kind="completion")
+
+        def on_llm_error(self, error, *, run_id, **kwargs):
+            self._finish(run_id, "error")
+
+    # A context variable whose default is set is picked up by every callback manager
+    handler_var = ContextVar("travel_agent_llm_metrics", default=LLMMetricsHandler())
+    register_configure_hook(handler_var, inheritable=True)
+
+
+def install_llm_deadlines() -> None:
+    """Refuse LangChain model calls made after the calling step's deadline.
+
+    A step abandoned by call_with_deadline keeps running on its thread; this stops
+    it at its next model call instead of letting it spend more tokens. A call
+    already in flight still runs to the client's own timeout.
+    """
+    global _llm_deadlines_installed
+
+    try:
+        from langchain_core.callbacks import BaseCallbackHandler
+        from langchain_core.tracers.context import register_configure_hook
+    except ImportError:
+        return
+
+    with _llm_metrics_lock:
+        if _llm_deadlines_installed:
+            return
+        _llm_deadlines_installed = True
+
+    class LLMDeadlineHandler(BaseCallbackHandler):
+        # Let DeadlineExceeded propagate instead of being logged and ignored
+        raise_error = True
+
+        def on_llm_start(self, serialized, prompts, **kwargs):
+            deadlines.check_deadline()
+
+        def on_chat_model_start(self, serialized, messages, **kwargs):
+            deadlines.check_deadline()
+
+    handler_var = ContextVar("travel_agent_llm_deadlines", default=LLMDeadlineHandler())
+    register_configure_hook(handler_var, inheritable=True)
+
+
+def build_portia_config() -> Config:
+    """Gemini config used by every entry point.
+
+    Setting TRAVEL_AGENT_LLM_BASE_URL switches to an OpenAI-compatible endpoint
+    instead - used to point the agent at the offline simulator in benchmarks/.
+    """
+    install_llm_metrics()
+    install_llm_deadlines()
+
+    llm_base_url = os.getenv("TRAVEL_AGENT_LLM_BASE_URL")
+    if llm_base_url:
+        # Both the openai client and langchain read the base URL from the environment
+        os.environ["OPENAI_BASE_URL"] = llm_base_url
+        os.environ["OPENAI_API_BASE"] = llm_base_url
+        return Config.from_default(
+            llm_provider=LLMProvider.OPENAI,
+            default_model=os.getenv("TRAVEL_AGENT_LLM_MODEL", "openai/gpt-4o-mini"),
+            openai_api_key=os.getenv("OPENAI_API_KEY", "simulator")
+        )
+
+    return Config.from_default(
+        llm_provider=LLMProvider.GOOGLE,
+        default_model="google/gemini-2.5-flash",
+        google_api_key=os.getenv("GOOGLE_API_KEY")
+    )
@@ -28,10 +28,11 @@ flight_tool = AmadeusScheduleTool(
     api_key=os.getenv("AMADEUS_API_KEY"),
     api_secret=os.getenv("AMADEUS_API_SECRET")
 )
+rail_tool = RailRadarSearchTool()
 
 # Use the SAME configured instance in registry
 
-all_custom_tools = [pexels_tool , flight_tool ]
+all_custom_tools = [pexels_tool , flight_tool , rail_tool ]
 custom_registry = ToolRegistry(all_custom_tools)
 combined_registry = example_tool_registry + custom_registry
 
@@ -0,0 +1,49 @@
+"""Request ids, request latency and the /metrics endpoints shared by both APIs"""
+import time
+import uuid
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+
+from tools import metrics
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+UNMATCHED_PATH = "<unmatched>"
+
+
+def install_metrics(app: FastAPI) -> None:
+    """Tag each request with an X-Request-ID, time it, and serve /metrics"""
+
+    @app.middleware("http")
+    async def request_metrics(request: Request, call_next):
+        request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+        token = metrics.request_id_var.set(request_id)
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            response.headers["X-Request-ID"] = request_id
+            return response
+        finally:
+            elapsed = time.perf_counter() - start
+            # Label by route template, not the raw path, so job ids don't explode cardinality;
+            # requests matching no route (404s, scanners) share one label
+            route = request.scope.get("route")
+            path = getattr(route, "path", UNMATCHED_PATH)
+            metrics.HTTP_REQUEST_DURATION.observe(elapsed, method=request.method, path=path, status=status)
+            metrics.record_span(f"http_request:{path}", elapsed, status=status)
+            metrics.request_id_var.reset(token)
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    def prometheus_metrics():
+        return PlainTextResponse(metrics.render_latest(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+    @app.get("/metrics/requests/{request_id}")
+    def request_trace(request_id: str):
+        """Spans recorded for one recent request: steps, tools, upstream calls and LLM calls"""
+        spans = metrics.TRACES.get(request_id)
+        if spans is None:
+            raise HTTPException(status_code=404, detail="Unknown or expired request id")
+        return {"request_id": request_id, "spans": spans}
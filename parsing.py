@@ -0,0 +1,85 @@
+import json
+import re
+from typing import Any, Optional, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+_FENCE_RE = re.compile(r"```(?:json)?", re.IGNORECASE)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+
+
+def strip_fences(text: str) -> str:
+    return _FENCE_RE.sub("", text).strip()
+
+
+def _first_json_block(text: str) -> Optional[str]:
+    """Return the first balanced {...} block, ignoring braces inside strings"""
+    start = text.find("{")
+    if start == -1:
+        return None
+
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+
+def _candidates(text: str):
+    yield text
+    block = _first_json_block(text)
+    if block is not None:
+        yield block
+        yield _TRAILING_COMMA_RE.sub(r"\1", block)
+
+
+def loads_tolerant(text: str) -> Optional[Any]:
+    """Parse JSON out of LLM output: strips fences, surrounding prose and trailing
+    commas, and as a last resort smart quotes used as JSON quotes. Returns None if
+    nothing parseable is found."""
+    cleaned = strip_fences(text)
+    # Curly quotes inside valid string values are content, so they're only replaced
+    # once nothing parses as it is
+    for attempt in (cleaned, cleaned.translate(_SMART_QUOTES)):
+        for candidate in _candidates(attempt):
+            try:
+                return json.loads(candidate)
+            except json.JSONDecodeError:
+                continue
+    return None
+
+
+def coerce_model(value: Any, model: Type[ModelT]) -> Optional[ModelT]:
+    """Validate an agent output (model instance, dict or text) against `model`"""
+    if isinstance(value, model):
+        return value
+    if isinstance(value, BaseModel):
+        value = value.model_dump()
+    if isinstance(value, str):
+        value = loads_tolerant(value)
+    if not isinstance(value, dict):
+        return None
+    try:
+        return model.model_validate(value)
+    except ValidationError:
+        return None
@@ -0,0 +1,36 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """Coalesce concurrent async calls that share a key into one execution.
+
+    The first caller for a key starts the work as a task; callers arriving while it
+    is in flight await the same task and receive its result (or exception). The
+    task is shielded so one client disconnecting doesn't cancel it for the others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._counters = {"requests": 0, "executions": 0, "merged": 0}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self._counters["requests"] += 1
+
+        task = self._inflight.get(key)
+        if task is None:
+            self._counters["executions"] += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self._counters["merged"] += 1
+
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._counters, "in_flight": len(self._inflight)}
@@ -0,0 +1,90 @@
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import pytest
+
+pytest.importorskip("portia")
+
+from tools import amadeus_tool
+from tools.amadeus_tool import AmadeusScheduleTool, AmadeusTokenCache
+
+
+class StubAmadeus(BaseHTTPRequestHandler):
+    """Token endpoint issuing tok1, tok2, ... and a slow flight-offers endpoint"""
+
+    expires_in = 1799
+    calls = Counter()
+    tokens_seen = []
+    lock = threading.Lock()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.lock:
+            self.calls["token"] += 1
+            token = f"tok{self.calls['token']}"
+        time.sleep(0.1)
+        self._json({"access_token": token, "expires_in": self.expires_in})
+
+    def do_GET(self):
+        with self.lock:
+            self.calls["offers"] += 1
+            self.tokens_seen.append(self.headers["Authorization"])
+        time.sleep(0.2)
+        offer = {"itineraries": [{"segments": [{"carrierCode": "AI", "number": "101"}]}], "price": {"total": "99"}}
+        self._json({"data": [offer]})
+
+    def _json(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def amadeus(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubAmadeus)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    StubAmadeus.calls, StubAmadeus.tokens_seen, StubAmadeus.expires_in = Counter(), [], 1799
+    monkeypatch.setattr(amadeus_tool, "token_cache", AmadeusTokenCache())
+    amadeus_tool.offer_cache.clear()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield AmadeusScheduleTool(api_key="key", api_secret="secret", base_url=base_url)
+    server.shutdown()
+
+
+def search_concurrently(tool, dates):
+    with ThreadPoolExecutor(max_workers=len(dates)) as executor:
+        return list(executor.map(lambda d: tool.search_offers("DEL", "BLR", d), dates))
+
+
+def test_concurrent_searches_share_one_token_request(amadeus):
+    dates = [f"2026-11-{day:02d}" for day in range(1, 11)]
+    search_concurrently(amadeus, dates)
+    assert StubAmadeus.calls == Counter(token=1, offers=10)
+    assert set(StubAmadeus.tokens_seen) == {"Bearer tok1"}
+
+
+def test_token_is_refreshed_once_expired(amadeus):
+    StubAmadeus.expires_in = 0.4  # refreshed half-way through, as it is shorter than the margin
+    amadeus.search_offers("DEL", "BLR", "2026-11-01")
+    time.sleep(0.3)
+    amadeus.search_offers("DEL", "BLR", "2026-11-02")
+    assert StubAmadeus.calls["token"] == 2
+    assert StubAmadeus.tokens_seen == ["Bearer tok1", "Bearer tok2"]
+
+
+def test_identical_concurrent_misses_make_one_offer_request(amadeus):
+    results = search_concurrently(amadeus, ["2026-11-01"] * 10)
+    assert StubAmadeus.calls == Counter(token=1, offers=1)
+    assert all(offers == results[0] for offers in results)
+    assert amadeus_tool._offer_locks == {}
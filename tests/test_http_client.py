@@ -0,0 +1,65 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from deadlines import deadline_context
+from tools import http_client
+
+
+class StubUpstream(BaseHTTPRequestHandler):
+    """Answers every GET with the next queued (status, retry_after) and counts calls"""
+
+    responses = []
+    calls = 0
+
+    def do_GET(self):
+        cls = type(self)
+        status, retry_after = cls.responses[min(cls.calls, len(cls.responses) - 1)]
+        cls.calls += 1
+        self.send_response(status)
+        if retry_after is not None:
+            self.send_header("Retry-After", str(retry_after))
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubUpstream)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    StubUpstream.calls = 0
+    yield StubUpstream, f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    http_client.close_all()
+
+
+def test_429_is_returned_without_retrying(upstream):
+    stub, url = upstream
+    stub.responses = [(429, 3600), (200, None)]
+    start = time.monotonic()
+    assert http_client.get(url).status_code == 429
+    assert stub.calls == 1
+    assert time.monotonic() - start < 1
+
+
+def test_503_retry_after_is_capped(upstream, monkeypatch):
+    stub, url = upstream
+    stub.responses = [(503, 3600), (200, None)]
+    monkeypatch.setattr(http_client, "RETRY_AFTER_MAX", 0.1)
+    start = time.monotonic()
+    assert http_client.get(url).status_code == 200
+    assert stub.calls == 2
+    assert time.monotonic() - start < 1
+
+
+def test_retry_after_wait_stops_at_the_step_deadline(upstream):
+    stub, url = upstream
+    stub.responses = [(503, 3600), (200, None)]
+    start = time.monotonic()
+    deadline_context("step", 0.2).run(http_client.get, url)
+    assert time.monotonic() - start < 1
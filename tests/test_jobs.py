@@ -0,0 +1,62 @@
+import pytest
+
+import jobs
+from jobs import FAILED, SUCCEEDED, JobStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(jobs, "time", fake)
+    return fake
+
+
+def finish(job, clock, status=SUCCEEDED):
+    job.finished_at = clock.now
+    job.status = status
+
+
+def test_finished_job_expires_on_read(clock):
+    store = JobStore(max_age=60)
+    job = store.create({}, ["flights"])
+    finish(job, clock)
+
+    clock.now += 59
+    assert store.get(job.id) is job
+    clock.now += 2
+    assert store.get(job.id) is None
+    assert store.stats()[SUCCEEDED] == 0
+
+
+def test_unfinished_job_never_expires(clock):
+    store = JobStore(max_age=60)
+    job = store.create({}, ["flights"])
+    clock.now += 3600
+    assert store.get(job.id) is job
+
+
+def test_stats_skip_expired_jobs(clock):
+    store = JobStore(max_age=60)
+    old, recent = store.create({}, []), store.create({}, [])
+    finish(old, clock, FAILED)
+    clock.now += 30
+    finish(recent, clock)
+    clock.now += 45
+    assert store.stats() == {"queued": 0, "running": 0, SUCCEEDED: 1, FAILED: 0}
+
+
+def test_oldest_finished_jobs_are_evicted_when_full(clock):
+    store = JobStore(max_jobs=2, max_age=60)
+    first, second = store.create({}, []), store.create({}, [])
+    finish(first, clock)
+    third = store.create({}, [])
+    assert store.get(first.id) is None
+    assert store.get(second.id) is second and store.get(third.id) is third
@@ -0,0 +1,64 @@
+import pytest
+
+from tools.locations import AIRPORT, STATION, airport_code, codes_for, location_index, station_code
+
+
+@pytest.mark.parametrize("code", ["DXB", "SIN", "SYD", "LAX", "ORD", "DOH", "AUH", "CMB"])
+def test_unknown_codes_pass_through(code):
+    assert location_index.resolve(code) is None
+    assert airport_code(code) == code
+    assert station_code(code) == code
+    assert codes_for(code) == (code, code, code)
+
+
+def test_unknown_code_in_parens_passes_through():
+    assert airport_code("Dubai (DXB)") == "DXB"
+    assert codes_for("Dubai, UAE (DXB)") == ("DXB", "DXB", "Dubai, UAE")
+
+
+@pytest.mark.parametrize("text, kind, code", [
+    ("BLR", AIRPORT, "BLR"),
+    ("blr", AIRPORT, "BLR"),
+    ("NDLS", AIRPORT, "DEL"),
+    ("NDLS", STATION, "NDLS"),
+    ("Bengaluru, Karnataka (BLR)", STATION, "SBC"),
+    ("Goa", AIRPORT, "GOI"),
+    ("Goa, India", AIRPORT, "GOI"),
+    ("bangalore", AIRPORT, "BLR"),
+    ("bengal", AIRPORT, "BLR"),
+    ("new delhi", STATION, "NDLS"),
+])
+def test_resolve(text, kind, code):
+    assert location_index.resolve(text, kind).code == code
+
+
+@pytest.mark.parametrize("text", ["Madrid", "Manila", "Manali", "Kannur", "Calicut", "banglore", "Karnataka"])
+def test_unknown_or_ambiguous_names_pass_through(text):
+    # No typo tolerance when resolving: a near miss must not become another city's airport
+    assert location_index.resolve(text) is None
+    assert airport_code(text) == text.upper()
+    assert station_code(text) == text.upper()
+    assert codes_for(text) == (text.upper(), text.upper(), text)
+
+
+def test_station_only_three_letter_code_is_not_an_airport():
+    assert location_index.resolve("CDG", AIRPORT) is None
+    assert location_index.resolve("CDG", STATION).code == "CDG"
+    assert codes_for("CDG")[0] == "CDG"
+
+
+def test_resolve_empty():
+    assert location_index.resolve("") is None
+    assert location_index.resolve("   ") is None
+
+
+def test_suggest_prefix_and_kind():
+    assert location_index.suggest("beng")[0].code == "BLR"
+    assert all(location.kind == STATION for location in location_index.suggest("beng", STATION))
+    assert len(location_index.suggest("a", limit=3)) == 3
+
+
+def test_suggest_fuzzy_only_for_longer_queries():
+    assert location_index.suggest("mumbia")[0].city == "Mumbai"
+    assert location_index.suggest("DXB") == ()
+    assert location_index.suggest("") == ()
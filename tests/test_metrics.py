@@ -0,0 +1,13 @@
+from tools import metrics
+
+
+def test_label_values_are_escaped():
+    counter = metrics.Counter("test_escaped_total", "Escaping", ("reason",))
+    counter.inc(reason='bad "quote"\\path\nnext')
+    assert counter.render()[-1] == 'test_escaped_total{reason="bad \\"quote\\"\\\\path\\nnext"} 1'
+
+
+def test_histogram_labels_are_escaped():
+    histogram = metrics.Histogram("test_escaped_seconds", "Escaping", ("path",), buckets=(1.0,))
+    histogram.observe(0.5, path='a"b')
+    assert 'test_escaped_seconds_bucket{path="a\\"b",le="1.0"} 1' in histogram.render()
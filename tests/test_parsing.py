@@ -0,0 +1,20 @@
+from parsing import loads_tolerant
+
+
+def test_curly_quotes_inside_valid_json_are_kept():
+    text = '{"overview": "Mumbai, the “City of Dreams”, is India’s largest city"}'
+    assert loads_tolerant(text) == {"overview": "Mumbai, the “City of Dreams”, is India’s largest city"}
+
+
+def test_fences_prose_and_trailing_commas():
+    text = 'Here is the guide:\n```json\n{"name": "Goa", "tags": ["beach", "food",],}\n```\nEnjoy!'
+    assert loads_tolerant(text) == {"name": "Goa", "tags": ["beach", "food"]}
+
+
+def test_smart_quotes_as_json_quotes_are_repaired():
+    assert loads_tolerant('{“name”: “Goa”}') == {"name": "Goa"}
+
+
+def test_unparseable_returns_none():
+    assert loads_tolerant("no json here") is None
+    assert loads_tolerant('{"unterminated": ') is None
@@ -0,0 +1,130 @@
+import pytest
+
+from tools import resilience
+from tools.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, RateLimitedError, \
+    TokenBucket, UpstreamGuard
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(resilience, "time", fake)
+    return fake
+
+
+def test_bucket_allows_burst_then_waits(clock):
+    bucket = TokenBucket(rate=2.0, capacity=3)
+    assert [bucket.reserve(max_wait=1) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.reserve(max_wait=1) == pytest.approx(0.5)
+    # The next caller queues behind the previous reservation
+    assert bucket.reserve(max_wait=1) == pytest.approx(1.0)
+    assert bucket.reserve(max_wait=1) is None
+
+
+def test_bucket_refills_up_to_capacity(clock):
+    bucket = TokenBucket(rate=1.0, capacity=2)
+    bucket.reserve(0)
+    bucket.reserve(0)
+    clock.now += 10
+    assert bucket.available() == 2
+
+
+def breaker():
+    return CircuitBreaker(failure_ratio=0.5, window=4, min_calls=4, reset_timeout=30)
+
+
+def test_breaker_opens_on_failure_ratio(clock):
+    b = breaker()
+    for success in (True, False, True):
+        b.record(success)
+    assert b.state == CLOSED
+    b.record(False)
+    assert b.state == OPEN
+    allowed, retry_after = b.before_call()
+    assert not allowed and retry_after == pytest.approx(30)
+
+
+def test_breaker_needs_min_calls(clock):
+    b = breaker()
+    for _ in range(3):
+        b.record(False)
+    assert b.state == CLOSED
+
+
+def tripped():
+    b = breaker()
+    for _ in range(4):
+        b.record(False)
+    return b
+
+
+def test_half_open_lets_one_probe_through(clock):
+    b = tripped()
+    clock.now += 30
+    assert b.before_call() == (True, 0.0)
+    assert b.state == HALF_OPEN
+    assert b.before_call()[0] is False
+
+
+def test_successful_probe_closes(clock):
+    b = tripped()
+    clock.now += 30
+    b.before_call()
+    b.record(True)
+    assert b.state == CLOSED
+    assert b.before_call() == (True, 0.0)
+
+
+def test_failed_probe_reopens(clock):
+    b = tripped()
+    clock.now += 30
+    b.before_call()
+    b.record(False)
+    assert b.state == OPEN
+    assert b.before_call()[0] is False
+
+
+def test_cancelled_probe_stays_half_open(clock):
+    b = tripped()
+    clock.now += 30
+    b.before_call()
+    b.cancel_probe()
+    assert b.state == HALF_OPEN
+    assert b.before_call() == (True, 0.0)
+
+
+def test_rate_limited_probe_does_not_close_breaker(clock):
+    guard = UpstreamGuard("test", TokenBucket(rate=0.01, capacity=1), tripped(), max_wait=0)
+    guard.bucket.reserve(0)
+    clock.now += 30
+    with pytest.raises(RateLimitedError):
+        guard.acquire()
+    assert guard.breaker.state == HALF_OPEN
+    # The probe slot was given back, so the next caller gets to probe
+    guard.bucket._tokens = 1
+    guard.acquire()
+    guard.record(False)
+    assert guard.breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        guard.acquire()
+
+
+def test_guard_waits_for_token(clock):
+    guard = UpstreamGuard("test", TokenBucket(rate=4.0, capacity=1), breaker(), max_wait=1)
+    guard.acquire()
+    guard.acquire()
+    assert clock.slept == [pytest.approx(0.25)]
+    assert guard.stats()["allowed"] == 2
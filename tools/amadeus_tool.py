@@ -1,33 +1,256 @@
-import requests
-from typing import ClassVar, Tuple
+import contextvars
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import Callable, ClassVar, Dict, Iterator, List, Optional, Tuple, Union
 from pydantic import BaseModel, Field, ConfigDict
 from portia import Tool, ToolRunContext
+from portia.errors import ToolSoftError
+
+from tools import http_client, metrics
+from tools.locations import airport_code
+from tools.response_cache import ResponseCache
+
+
+# Offers for one (route, date) are reused for a few minutes - fares move, but not by the second
+offer_cache = ResponseCache(
+    namespace="amadeus:offers",
+    ttl=float(os.getenv("AMADEUS_CACHE_TTL", "600")),
+    maxsize=int(os.getenv("AMADEUS_CACHE_SIZE", "1024")),
+)
+
+# One lock per (route, date, currency) being fetched, with the number of threads holding or
+# waiting for it, so concurrent misses for the same search make one upstream call
+_offer_locks: Dict[str, List] = {}
+_offer_locks_lock = threading.Lock()
+
+# Every search fetches at least this many offers, so callers asking for fewer share one cache entry
+OFFER_PAGE_SIZE = int(os.getenv("AMADEUS_OFFER_PAGE_SIZE", "10"))
+
+FARE_CALENDAR_MAX_DAYS = int(os.getenv("FARE_CALENDAR_MAX_DAYS", "31"))
+FARE_CALENDAR_WORKERS = int(os.getenv("FARE_CALENDAR_WORKERS", "6"))
 
 
 class FlightScheduleInput(BaseModel):
-    origin: str = Field(..., description="Origin IATA code (e.g., NAG)")
-    destination: str = Field(..., description="Destination IATA code (e.g., PNQ)")
-    departure_date: str = Field(..., description="Departure date YYYY-MM-DD")
+    origin: str = Field(..., description="Origin IATA code or city name (e.g., NAG or Nagpur)")
+    destination: str = Field(..., description="Destination IATA code or city name (e.g., PNQ or Pune)")
+    departure_date: str = Field(..., description="Departure date YYYY-MM-DD (first day of the range if end_date is set)")
+    end_date: Optional[str] = Field(
+        None, description="Optional last departure date YYYY-MM-DD, to compare fares per day over a range"
+    )
+    flex_days: int = Field(0, description="Optional number of days to also search either side of the date(s)")
+
+
+class FlightOffer(BaseModel):
+    airline: Optional[str] = None
+    flight_number: Optional[str] = None
+    departure_airport: Optional[str] = None
+    departure_time: Optional[str] = None
+    arrival_airport: Optional[str] = None
+    arrival_time: Optional[str] = None
+    duration: Optional[str] = None
+    price: Optional[str] = None
+    currency: Optional[str] = None
+    stops: Optional[int] = None
+
+
+def offer_to_flight(offer: dict) -> Optional[FlightOffer]:
+    """Map one Amadeus flight-offer dict to a FlightOffer (None if it has no segments)"""
+    itineraries = offer.get("itineraries", [])
+    if not itineraries:
+        return None
+    segments = itineraries[0].get("segments", [])
+    if not segments:
+        return None
+
+    first, last = segments[0], segments[-1]
+    dep = first.get("departure", {})
+    arr = last.get("arrival", {})
+
+    # Defensive price lookup
+    price_block = offer.get("price", {})
+    return FlightOffer(
+        airline=first.get("carrierCode"),
+        flight_number=f"{first.get('carrierCode', '')}{first.get('number', '')}" or None,
+        departure_airport=dep.get("iataCode"),
+        departure_time=dep.get("at"),
+        arrival_airport=arr.get("iataCode"),
+        arrival_time=arr.get("at"),
+        duration=itineraries[0].get("duration"),
+        price=price_block.get("total") or price_block.get("grandTotal"),
+        currency=price_block.get("currency"),
+        stops=len(segments) - 1,
+    )
+
+
+class FareDay(BaseModel):
+    date: str
+    min_price: Optional[float] = None
+    median_price: Optional[float] = None
+    currency: Optional[str] = None
+    offers: int = 0
+    error: Optional[str] = None
+
+
+def summarize_fares(departure_date: str, flights: List[FlightOffer]) -> FareDay:
+    """Collapse one day's offers into its min/median price"""
+    prices = []
+    for flight in flights:
+        try:
+            prices.append(float(flight.price))
+        except (TypeError, ValueError):
+            continue
+    return FareDay(
+        date=departure_date,
+        min_price=min(prices) if prices else None,
+        median_price=round(statistics.median(prices), 2) if prices else None,
+        currency=next((f.currency for f in flights if f.currency), None),
+        offers=len(flights),
+    )
+
+
+def calendar_dates(start_date: str, end_date: Optional[str] = None, flex_days: int = 0) -> List[str]:
+    """Every date from start to end (inclusive), widened by `flex_days` on both sides"""
+    start = date.fromisoformat(start_date)
+    end = date.fromisoformat(end_date) if end_date else start
+    if end < start:
+        raise ValueError("end_date must not be before start_date")
+    if flex_days < 0:
+        raise ValueError("flex_days must not be negative")
+
+    start -= timedelta(days=flex_days)
+    end += timedelta(days=flex_days)
+    days = (end - start).days + 1
+    if days > FARE_CALENDAR_MAX_DAYS:
+        raise ValueError(f"Date range covers {days} days, at most {FARE_CALENDAR_MAX_DAYS} are allowed")
+    return [(start + timedelta(days=i)).isoformat() for i in range(days)]
+
+
+@contextmanager
+def _offer_lock(cache_key: str) -> Iterator[None]:
+    with _offer_locks_lock:
+        entry = _offer_locks.setdefault(cache_key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _offer_locks_lock:
+            entry[1] -= 1
+            if not entry[1]:
+                del _offer_locks[cache_key]
+
+
+def _cached_offers(cache_key: str, max_results: int) -> Optional[list]:
+    cached = offer_cache.get(cache_key)
+    # A short page is everything Amadeus had; a full one may be cut short of what this caller wants
+    if cached is not None and (max_results <= cached["max"] or len(cached["offers"]) < cached["max"]):
+        return cached["offers"][:max_results]
+    return None
+
+
+def render_flights(flights: List[FlightOffer], origin: str, destination: str, departure_date: str) -> str:
+    """Human-readable listing, only for places that need text (CLI output, prompts)"""
+    if not flights:
+        return f"No flights found from {origin} to {destination} on {departure_date}"
+
+    result = f"✈️ Flights from {origin} to {destination} on {departure_date}:\n\n"
+    for i, flight in enumerate(flights, 1):
+        result += f"{i}. {flight.flight_number or 'N/A'}\n"
+        result += f"   Departure: {flight.departure_airport or 'N/A'} at {flight.departure_time or 'N/A'}\n"
+        result += f"   Arrival: {flight.arrival_airport or 'N/A'} at {flight.arrival_time or 'N/A'}\n"
+        result += f"   Price: {flight.price or 'N/A'} {flight.currency or ''}\n\n"
+    return result
+
+
+class AmadeusTokenCache:
+    """Thread-safe cache of Amadeus OAuth access tokens keyed by api_key.
+
+    Tokens are refreshed `refresh_margin` seconds before the `expires_in` reported
+    by the token endpoint. Refresh is single-flight: concurrent callers for the same
+    key wait on one token request instead of each POSTing their own.
+    """
+
+    def __init__(self, refresh_margin: float = 60.0):
+        self.refresh_margin = refresh_margin
+        self._tokens: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self._refresh_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _valid_token(self, key: Tuple[str, str]):
+        entry = self._tokens.get(key)
+        if entry and time.monotonic() < entry[1]:
+            return entry[0]
+        return None
+
+    def get(self, key: Tuple[str, str], fetch: Callable[[], Tuple[str, float]]) -> str:
+        with self._lock:
+            token = self._valid_token(key)
+            if token:
+                return token
+            refresh_lock = self._refresh_locks.setdefault(key, threading.Lock())
+
+        with refresh_lock:
+            # Another thread may have refreshed the token while we were waiting
+            with self._lock:
+                token = self._valid_token(key)
+                if token:
+                    return token
+
+            token, expires_in = fetch()
+            # Never refresh earlier than half-way through a short-lived token
+            lifetime = max(expires_in - self.refresh_margin, expires_in / 2)
+            with self._lock:
+                self._tokens[key] = (token, time.monotonic() + lifetime)
+            return token
+
+    def invalidate(self, key: Tuple[str, str]) -> None:
+        with self._lock:
+            self._tokens.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tokens.clear()
+
+
+# Shared by every AmadeusScheduleTool instance in the process
+token_cache = AmadeusTokenCache()
 
 
 class AmadeusScheduleTool(Tool):
     id: str = "amadeus_schedule"
     name: str = "amadeus_schedule"
-    description: str = "Get upcoming flights using Amadeus Flight Offers API"
+    description: str = (
+        "Get upcoming flights using Amadeus Flight Offers API, or the cheapest days to fly "
+        "over a date range (end_date / flex_days)"
+    )
 
     api_key: str = Field(..., description="Amadeus API Key")
     api_secret: str = Field(..., description="Amadeus API Secret")
+    base_url: str = Field(
+        default_factory=lambda: os.getenv("AMADEUS_BASE_URL", "https://test.api.amadeus.com"),
+        description="Amadeus API base URL"
+    )
 
     args_schema: type[BaseModel] = FlightScheduleInput
     output_schema: ClassVar[Tuple[str, str]] = (
-        "string",
-        "Returns upcoming flights with times and prices"
+        "List[FlightOffer] | List[FareDay]",
+        "Upcoming flights with airline, flight number, times, duration, price and stops; with "
+        "end_date or flex_days, the min/median price per day over the range instead"
     )
     model_config = ConfigDict(extra="allow", arbitrary_types_allowed=True)
 
-    def get_access_token(self) -> str:
-        resp = requests.post(
-            "https://test.api.amadeus.com/v1/security/oauth2/token",
+    def _token_cache_key(self) -> Tuple[str, str]:
+        return (self.base_url, self.api_key)
+
+    def fetch_access_token(self) -> Tuple[str, float]:
+        resp = http_client.post(
+            f"{self.base_url}/v1/security/oauth2/token",
+            upstream="amadeus",
             data={
                 "grant_type": "client_credentials",
                 "client_id": self.api_key,
@@ -36,63 +259,101 @@ class AmadeusScheduleTool(Tool):
             headers={"Content-Type": "application/x-www-form-urlencoded"}
         )
         resp.raise_for_status()
-        return resp.json()["access_token"]
+        payload = resp.json()
+        return payload["access_token"], float(payload.get("expires_in", 1799))
 
-    def run(self, context: ToolRunContext, origin: str, destination: str, departure_date: str) -> str:
-        try:
-            token = self.get_access_token()
-            url = "https://test.api.amadeus.com/v2/shopping/flight-offers"
-            headers = {"Authorization": f"Bearer {token}"}
-            params = {
-                "originLocationCode": origin.upper(),
-                "destinationLocationCode": destination.upper(),
-                "departureDate": departure_date,
-                "adults": 1,
-                "max": 5
-            }
+    def get_access_token(self) -> str:
+        return token_cache.get(self._token_cache_key(), self.fetch_access_token)
+
+    def search_offers(self, origin: str, destination: str, departure_date: str, max_results: int = 5,
+                      currency: Optional[str] = None) -> list:
+        """Raw flight-offer dicts from the Amadeus API, cached per (route, date, currency).
 
-            resp = requests.get(url, headers=headers, params=params)
-            resp.raise_for_status()
+        One page of at least OFFER_PAGE_SIZE offers is fetched and cached, and each
+        caller gets the first `max_results` of it. Concurrent misses for the same
+        search wait for the first one's page instead of each calling Amadeus.
+        """
+        # "Bengaluru", "bangalore" and "BLR" are the same search
+        origin, destination = airport_code(origin), airport_code(destination)
+        cache_key = f"{origin}|{destination}|{departure_date}" + (f"|{currency}" if currency else "")
+        offers = _cached_offers(cache_key, max_results)
+        if offers is not None:
+            return offers
 
-            payload = resp.json()
-            flights = payload.get("data", [])
+        with _offer_lock(cache_key):
+            # Another thread may have fetched this page while we were waiting
+            offers = _cached_offers(cache_key, max_results)
+            if offers is not None:
+                return offers
+            return self._fetch_offers(cache_key, origin, destination, departure_date, max_results, currency)
 
-            if not flights:
-                return f"No flights found from {origin} to {destination} on {departure_date}"
+    def _fetch_offers(self, cache_key: str, origin: str, destination: str, departure_date: str,
+                      max_results: int, currency: Optional[str]) -> list:
+        page_size = max(OFFER_PAGE_SIZE, max_results)
 
-            result = f"✈️ Flights from {origin} to {destination} on {departure_date}:\n\n"
+        url = f"{self.base_url}/v2/shopping/flight-offers"
+        params = {
+            "originLocationCode": origin,
+            "destinationLocationCode": destination,
+            "departureDate": departure_date,
+            "adults": 1,
+            "max": page_size
+        }
+        if currency:
+            params["currencyCode"] = currency
 
-            for i, offer in enumerate(flights, 1):
-                # FIXED: Access first segment in list
-                itineraries = offer.get("itineraries", [])
-                if not itineraries:
-                    continue
+        headers = {"Authorization": f"Bearer {self.get_access_token()}"}
+        resp = http_client.get(url, upstream="amadeus", headers=headers, params=params)
+        if resp.status_code == 401:
+            # Token was revoked or expired early - drop it and retry once
+            token_cache.invalidate(self._token_cache_key())
+            headers = {"Authorization": f"Bearer {self.get_access_token()}"}
+            resp = http_client.get(url, upstream="amadeus", headers=headers, params=params)
+        resp.raise_for_status()
+
+        offers = resp.json().get("data", [])
+        offer_cache.set(cache_key, {"max": page_size, "offers": offers})
+        return offers[:max_results]
 
-                segments = itineraries[0].get("segments", [])
-                if not segments:
-                    continue
+    def search_flights(self, origin: str, destination: str, departure_date: str,
+                       max_results: int = 5, currency: Optional[str] = None) -> List[FlightOffer]:
+        offers = self.search_offers(origin, destination, departure_date, max_results, currency)
+        return [flight for flight in map(offer_to_flight, offers) if flight is not None]
 
-                seg = segments[0]  # ← FIXED: Get first segment from list
+    def fare_calendar(self, origin: str, destination: str, start_date: str, end_date: Optional[str] = None,
+                      flex_days: int = 0, max_results: int = OFFER_PAGE_SIZE) -> List[FareDay]:
+        """Min/median price per day over a date range, one concurrent query per date.
 
-                dep = seg.get("departure", {})
-                arr = seg.get("arrival", {})
-                airline = seg.get("carrierCode", "N/A")
-                number = seg.get("number", "N/A")
+        All queries share one access token and the pooled Amadeus session; a day
+        that fails carries its own error instead of failing the whole calendar.
+        """
+        dates = calendar_dates(start_date, end_date, flex_days)
 
-                # Defensive price lookup
-                price_block = offer.get("price", {})
-                total = price_block.get("total") or price_block.get("grandTotal") or "N/A"
-                currency = price_block.get("currency", "")
+        # Fetch the token once up front rather than letting the first wave race for it
+        self.get_access_token()
 
-                result += f"{i}. {airline}{number}\n"
-                result += f"   Departure: {dep.get('iataCode', 'N/A')} at {dep.get('at', 'N/A')}\n"
-                result += f"   Arrival: {arr.get('iataCode', 'N/A')} at {arr.get('at', 'N/A')}\n"
-                result += f"   Price: {total} {currency}\n\n"
+        def search_day(departure_date: str) -> FareDay:
+            try:
+                flights = self.search_flights(origin, destination, departure_date, max_results)
+                return summarize_fares(departure_date, flights)
+            except Exception as e:
+                return FareDay(date=departure_date, error=str(e))
 
-            return result
+        # Captured here, not in the workers, so each day keeps the request id and deadline
+        context = contextvars.copy_context()
+        with ThreadPoolExecutor(max_workers=min(len(dates), FARE_CALENDAR_WORKERS)) as executor:
+            futures = [executor.submit(context.copy().run, search_day, d) for d in dates]
+            return [future.result() for future in futures]
 
+    @metrics.instrumented_tool
+    def run(self, context: ToolRunContext, origin: str, destination: str, departure_date: str,
+            end_date: Optional[str] = None, flex_days: int = 0) -> Union[List[FlightOffer], List[FareDay]]:
+        try:
+            if end_date or flex_days:
+                return self.fare_calendar(origin, destination, departure_date, end_date, flex_days)
+            return self.search_flights(origin, destination, departure_date)
         except Exception as e:
-            return f"Error fetching flights: {e}"
+            raise ToolSoftError(f"Error fetching flights: {e}") from e
 
 
 # Add this at the very bottom of your file, after the AmadeusScheduleTool class
@@ -115,4 +376,4 @@ if __name__ == "__main__":
 
     # Test single query
     result = tool.run(MockContext(), "DEL", "BLR", "2025-08-25")
-    print(result)
+    print(render_flights(result, "DEL", "BLR", "2025-08-25"))
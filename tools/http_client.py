@@ -0,0 +1,170 @@
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import deadlines
+from tools import metrics, resilience
+
+
+# Tunables for every upstream tool (Amadeus, Pexels, RailRadar)
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "15"))
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.3"))
+RETRY_AFTER_MAX = float(os.getenv("HTTP_RETRY_AFTER_MAX", "3"))
+
+DEFAULT_TIMEOUT: Tuple[float, float] = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+class _UpstreamRetry(Retry):
+    """urllib3 Retry that leaves 429s to the caller and never sleeps long on Retry-After.
+
+    A 429 goes straight back through the upstream's guard, so the breaker sees it
+    and the quota isn't spent again behind the rate limiter's back. A 503's
+    Retry-After is honoured up to RETRY_AFTER_MAX or what is left of the step.
+    """
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if status_code == 429:
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+    def get_retry_after(self, response) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        left = deadlines.time_left()
+        cap = RETRY_AFTER_MAX if left is None else min(RETRY_AFTER_MAX, left)
+        return max(0.0, min(retry_after, cap))
+
+
+def _build_session() -> requests.Session:
+    retry = _UpstreamRetry(
+        total=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=(500, 502, 503, 504),
+        # The only POST we make is the idempotent Amadeus token request
+        allowed_methods=frozenset({"GET", "HEAD", "POST"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session(url: str) -> requests.Session:
+    """Return the pooled keep-alive session for the host of `url`"""
+    parts = urlsplit(url)
+    host = f"{parts.scheme}://{parts.netloc}"
+
+    session = _sessions.get(host)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(host)
+            if session is None:
+                session = _sessions[host] = _build_session()
+    return session
+
+
+def _within_deadline(timeout):
+    """`timeout` cut down to what is left of the calling step's deadline (deadlines.py)"""
+    left = deadlines.time_left()
+    if left is None:
+        return timeout
+    if left <= 0:
+        # An abandoned step stops here rather than calling the upstream
+        raise requests.Timeout("Step deadline passed before the request was sent")
+    if timeout is None:
+        return left
+    if isinstance(timeout, tuple):
+        return tuple(min(t, left) for t in timeout)
+    return min(timeout, left)
+
+
+def request(method: str, url: str, upstream: Optional[str] = None, **kwargs) -> requests.Response:
+    """Send a request on the host's pooled session.
+
+    With `upstream` set, the call goes through that upstream's rate limiter and
+    circuit breaker (tools/resilience.py) and may raise UpstreamUnavailable
+    without touching the network. Inside a step with a deadline, the timeout is
+    capped at the time the step has left.
+    """
+    kwargs["timeout"] = _within_deadline(kwargs.get("timeout", DEFAULT_TIMEOUT))
+    guard = resilience.guard_for(upstream) if upstream else None
+    if guard:
+        guard.acquire()
+
+    host = urlsplit(url).netloc
+    start = time.perf_counter()
+    status = "error"
+    try:
+        response = get_session(url).request(method, url, **kwargs)
+        status = str(response.status_code)
+        if response.status_code >= 400:
+            metrics.UPSTREAM_ERRORS.inc(host=host, reason=status)
+        if guard:
+            guard.record(not resilience.is_failure(response.status_code))
+        return response
+    except requests.RequestException as e:
+        metrics.UPSTREAM_ERRORS.inc(host=host, reason=type(e).__name__)
+        if guard:
+            guard.record(False)
+        raise
+    finally:
+        # Includes urllib3's own retries and backoff, which is what the caller waits for
+        elapsed = time.perf_counter() - start
+        metrics.UPSTREAM_DURATION.observe(elapsed, host=host, method=method, status=status)
+        metrics.record_span(f"http:{host}", elapsed, method=method, status=status)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def validators(response: requests.Response) -> Dict[str, str]:
+    """The response's ETag / Last-Modified, to revalidate it later with `get_conditional`"""
+    found = {}
+    if response.headers.get("ETag"):
+        found["etag"] = response.headers["ETag"]
+    if response.headers.get("Last-Modified"):
+        found["last_modified"] = response.headers["Last-Modified"]
+    return found
+
+
+def get_conditional(url: str, cached: Optional[Dict[str, str]] = None, **kwargs) -> requests.Response:
+    """GET with If-None-Match / If-Modified-Since from `cached` validators.
+
+    A 304 means the body cached alongside those validators is still current.
+    """
+    headers = dict(kwargs.pop("headers", None) or {})
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+    return request("GET", url, headers=headers, **kwargs)
+
+
+def close_all() -> None:
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,338 @@
+"""On-disk, content-addressed cache behind the /images/{id} proxy.
+
+Search results register each Pexels image or video poster URL under a stable id
+(a hash of the URL). The first request for an id downloads the image once and
+stores it under the SHA-256 of its bytes, so the same picture reached through two
+URLs is stored once; resized variants sit next to it as "<sha>-w<width>". Files
+are evicted least-recently-used once the cache passes IMAGE_CACHE_MAX_BYTES, and
+access times are kept in file mtimes so the order survives restarts.
+
+Thumbnails are made with Pillow when it is installed. Without it, images on the
+Pexels CDN are fetched straight at the requested width through its own resizing
+parameters (without downloading the original), and anything else is served at
+its original size. Registered ids are capped at IMAGE_CACHE_MAX_REFS, dropping
+the least recently used.
+"""
+import hashlib
+import json
+import os
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from io import BytesIO
+from typing import Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from tools import http_client
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional
+    Image = None
+
+
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", ".image_cache")
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# Requested widths snap up to one of these, so each image has a handful of variants at most
+IMAGE_WIDTHS = tuple(sorted(int(w) for w in os.getenv("IMAGE_WIDTHS", "160,320,640,1280").split(",")))
+THUMBNAIL_QUALITY = int(os.getenv("IMAGE_THUMBNAIL_QUALITY", "82"))
+IMAGE_CACHE_MAX_REFS = int(os.getenv("IMAGE_CACHE_MAX_REFS", "100000"))
+
+PEXELS_CDN_HOST = "images.pexels.com"
+
+
+class StoredImage:
+    def __init__(self, body: bytes, etag: str, content_type: str):
+        self.body = body
+        self.etag = etag
+        self.content_type = content_type
+
+
+def sniff_content_type(data: bytes) -> str:
+    if data.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    if data.startswith(b"\x89PNG"):
+        return "image/png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    return "application/octet-stream"
+
+
+def snap_width(width: Optional[int]) -> Optional[int]:
+    """The smallest configured width that covers `width` (None or anything larger means the original)"""
+    if not width or width <= 0:
+        return None
+    index = bisect_left(IMAGE_WIDTHS, width)
+    return IMAGE_WIDTHS[index] if index < len(IMAGE_WIDTHS) else None
+
+
+def cdn_resized_url(url: str, width: int) -> Optional[str]:
+    """The Pexels CDN URL for `url` scaled to `width`, or None for other hosts"""
+    parts = urlsplit(url)
+    if parts.netloc != PEXELS_CDN_HOST:
+        return None
+    query = {k: v for k, v in parse_qsl(parts.query) if k not in ("h", "w", "dpr", "fit")}
+    query.update({"auto": "compress", "cs": "tinysrgb", "w": str(width)})
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def image_width(data: bytes) -> Optional[int]:
+    if Image is None:
+        return None
+    try:
+        with Image.open(BytesIO(data)) as image:
+            return image.width
+    except Exception:
+        return None
+
+
+def make_thumbnail(data: bytes, width: int) -> Optional[bytes]:
+    """JPEG of `data` scaled down to `width`, or None if Pillow is missing or it is already that narrow"""
+    if Image is None:
+        return None
+    with Image.open(BytesIO(data)) as image:
+        if image.width <= width:
+            return None
+        image = image.convert("RGB")
+        image.thumbnail((width, image.height * width // image.width + 1))
+        out = BytesIO()
+        image.save(out, format="JPEG", quality=THUMBNAIL_QUALITY, optimize=True)
+        return out.getvalue()
+
+
+class ImageStore:
+    def __init__(self, root: str, max_bytes: int, max_refs: int = IMAGE_CACHE_MAX_REFS):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_refs = max_refs
+        self._refs_dir = os.path.join(root, "refs")
+        self._blobs_dir = os.path.join(root, "blobs")
+        os.makedirs(self._refs_dir, exist_ok=True)
+        os.makedirs(self._blobs_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # Serialises read-modify-write of ref files
+        self._refs_lock = threading.Lock()
+        # image id -> None, least recently used first
+        self._refs: "OrderedDict[str, None]" = OrderedDict()
+        # blob path -> size, least recently used first
+        self._lru: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "refs_evicted": 0}
+
+        refs = []
+        for entry in os.scandir(self._refs_dir):
+            if entry.name.endswith(".tmp"):
+                os.remove(entry.path)
+                continue
+            refs.append((entry.stat().st_mtime, entry.name))
+        for _, image_id in sorted(refs):
+            self._refs[image_id] = None
+
+        blobs = []
+        for directory, _, files in os.walk(self._blobs_dir):
+            for name in files:
+                path = os.path.join(directory, name)
+                if name.endswith(".tmp"):
+                    os.remove(path)
+                    continue
+                stat = os.stat(path)
+                blobs.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(blobs):
+            self._lru[path] = size
+            self._total += size
+
+    # -- ids ---------------------------------------------------------------
+
+    def register(self, url: str) -> str:
+        """Stable id for `url`, recorded on disk so the proxy can fetch it later"""
+        image_id = hashlib.sha1(url.encode("utf-8")).hexdigest()[:20]
+        with self._lock:
+            if image_id in self._refs:
+                self._refs.move_to_end(image_id)
+                return image_id
+            self._refs[image_id] = None
+            evict = []
+            while len(self._refs) > self.max_refs:
+                evict.append(self._refs.popitem(last=False)[0])
+            self._counters["refs_evicted"] += len(evict)
+        self._write_json(self._ref_path(image_id), {"url": url})
+        for old_id in evict:
+            # Its blobs stay until the byte-size LRU gets to them
+            try:
+                os.remove(self._ref_path(old_id))
+            except FileNotFoundError:
+                pass
+        return image_id
+
+    def _ref_path(self, image_id: str) -> str:
+        return os.path.join(self._refs_dir, image_id)
+
+    def _read_ref(self, image_id: str) -> dict:
+        if not image_id.isalnum():
+            raise KeyError(image_id)
+        try:
+            with open(self._ref_path(image_id), encoding="utf-8") as f:
+                ref = json.load(f)
+        except FileNotFoundError:
+            raise KeyError(image_id) from None
+        with self._lock:
+            if image_id in self._refs:
+                self._refs.move_to_end(image_id)
+        return ref
+
+    def _update_ref(self, image_id: str, **changes) -> dict:
+        with self._refs_lock:
+            ref = {**self._read_ref(image_id), **changes}
+            self._write_json(self._ref_path(image_id), ref)
+        return ref
+
+    @staticmethod
+    def _write_json(path: str, value: dict) -> None:
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(value, f)
+        os.replace(tmp, path)
+
+    # -- blobs -------------------------------------------------------------
+
+    def _blob_path(self, name: str) -> str:
+        return os.path.join(self._blobs_dir, name[:2], name)
+
+    def _read_blob(self, name: str) -> Optional[bytes]:
+        path = self._blob_path(name)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self._total -= self._lru.pop(path, 0)
+            return None
+        with self._lock:
+            if path in self._lru:
+                self._lru.move_to_end(path)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def _write_blob(self, name: str, data: bytes) -> None:
+        path = self._blob_path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._total += len(data) - self._lru.pop(path, 0)
+            self._lru[path] = len(data)
+            evict = []
+            while self._total > self.max_bytes and len(self._lru) > 1:
+                old_path, size = self._lru.popitem(last=False)
+                self._total -= size
+                evict.append(old_path)
+            self._counters["evictions"] += len(evict)
+        for old_path in evict:
+            try:
+                os.remove(old_path)
+            except FileNotFoundError:
+                pass
+
+    def _fetch(self, url: str) -> bytes:
+        response = http_client.get(url, upstream="pexels_images")
+        response.raise_for_status()
+        return response.content
+
+    def _original(self, image_id: str, ref: dict) -> Tuple[dict, bytes]:
+        """(updated ref, bytes) of the full-size image, downloading it if it isn't on disk"""
+        if ref.get("sha"):
+            data = self._read_blob(ref["sha"])
+            if data is not None:
+                return ref, data
+
+        data = self._fetch(ref["url"])
+        sha = hashlib.sha256(data).hexdigest()
+        self._write_blob(sha, data)
+        if ref.get("sha") != sha:
+            ref = self._update_ref(image_id, sha=sha, width=image_width(data))
+        return ref, data
+
+    @staticmethod
+    def _variant_width(ref: dict, width: Optional[int]) -> Optional[int]:
+        """Width of the variant to serve for `width`, or None for the original"""
+        if not width:
+            return None
+        if Image is None:
+            # Only the Pexels CDN can resize for us
+            return width if cdn_resized_url(ref["url"], width) else None
+        # No variant for an original that is already that narrow
+        return None if ref.get("width") and ref["width"] <= width else width
+
+    @staticmethod
+    def _blob_name(ref: dict, wanted: Optional[int]) -> Optional[str]:
+        if wanted is None:
+            return ref.get("sha")
+        if Image is None:
+            return ref.get("variants", {}).get(str(wanted))
+        return f"{ref['sha']}-w{wanted}" if ref.get("sha") else None
+
+    def get(self, image_id: str, width: Optional[int] = None) -> StoredImage:
+        """The image, scaled down to a configured width if asked; raises KeyError for unknown ids"""
+        ref = self._read_ref(image_id)
+        width = snap_width(width)
+
+        wanted = self._variant_width(ref, width)
+        name = self._blob_name(ref, wanted)
+        if name:
+            data = self._read_blob(name)
+            if data is not None:
+                self._count("hits")
+                return StoredImage(data, f'"{name}"', sniff_content_type(data))
+
+        self._count("misses")
+        if wanted and Image is None:
+            # Fetch only the resized copy; the original is never needed for it
+            data = self._fetch(cdn_resized_url(ref["url"], wanted))
+            name = hashlib.sha256(data).hexdigest()
+            self._write_blob(name, data)
+            with self._refs_lock:
+                current = self._read_ref(image_id)
+                variants = {**current.get("variants", {}), str(wanted): name}
+                self._write_json(self._ref_path(image_id), {**current, "variants": variants})
+            return StoredImage(data, f'"{name}"', sniff_content_type(data))
+
+        ref, original = self._original(image_id, ref)
+        wanted = self._variant_width(ref, width)
+        if wanted:
+            thumbnail = make_thumbnail(original, wanted)
+            if thumbnail is not None:
+                name = f"{ref['sha']}-w{wanted}"
+                self._write_blob(name, thumbnail)
+                return StoredImage(thumbnail, f'"{name}"', sniff_content_type(thumbnail))
+        return StoredImage(original, f'"{ref["sha"]}"', sniff_content_type(original))
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._counters,
+                "files": len(self._lru),
+                "refs": len(self._refs),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "thumbnails": "pillow" if Image is not None else "cdn",
+            }
+
+
+image_store = ImageStore(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES, IMAGE_CACHE_MAX_REFS)
+
+
+def proxy_path(url: Optional[str]) -> Optional[str]:
+    """/images/{id} path serving `url` through the proxy"""
+    return f"/images/{image_store.register(url)}" if url else None
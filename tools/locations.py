@@ -0,0 +1,255 @@
+"""Airports and railway stations, with prefix and typo-tolerant lookup.
+
+The index is built once at import from `locations.json` (or LOCATIONS_FILE) into
+a sorted array of search keys - codes, city and station names, the trailing
+words of multi-word names, states and aliases such as "Bangalore" - so a prefix
+lookup is two bisects. Queries with no prefix match fall back to a bounded
+edit-distance scan over keys sharing the query's first letter.
+
+`airport_code`, `station_code` and `city_name` turn free text like "bengaluru",
+"Bengaluru, Karnataka (BLR)" or "NDLS" into what each upstream expects.
+"""
+import json
+import os
+import re
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+
+AIRPORT = "airport"
+STATION = "station"
+KINDS = (AIRPORT, STATION)
+
+LOCATIONS_FILE = os.getenv("LOCATIONS_FILE", os.path.join(os.path.dirname(__file__), "locations.json"))
+
+# Match ranks, best first
+EXACT_CODE, EXACT_NAME, PREFIX, WORD_PREFIX, FUZZY = range(5)
+
+_CODE_IN_PARENS = re.compile(r"\(([A-Za-z]{1,4})\)\s*$")
+_CODE_LIKE = re.compile(r"[A-Za-z]{2,4}")
+# Shorter queries are too ambiguous for typo tolerance ("DXB" is one edit from "DIB")
+MIN_FUZZY_LENGTH = 4
+# resolve() takes a prefix only when it is this long and every match is in one city
+MIN_RESOLVE_PREFIX_LENGTH = 4
+
+
+class Location(BaseModel):
+    code: str
+    name: str
+    city: str
+    state: str
+    kind: str
+
+
+def normalize(text: str) -> str:
+    """Lower-case, drop punctuation and collapse whitespace: "K.S.R.  Bengaluru" -> "k s r bengaluru" """
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split())
+
+
+def prefix_distance(query: str, key: str, max_distance: int) -> int:
+    """Edit distance (with transpositions) between `query` and the closest prefix of `key`"""
+    key = key[:len(query) + max_distance]
+    previous2: List[int] = []
+    previous = list(range(len(key) + 1))
+    for i in range(1, len(query) + 1):
+        current = [i] + [0] * len(key)
+        for j in range(1, len(key) + 1):
+            cost = 0 if query[i - 1] == key[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and query[i - 1] == key[j - 2] and query[i - 2] == key[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return min(previous)
+
+
+class LocationIndex:
+    def __init__(self, locations: List[Location], aliases: Optional[Dict[str, str]] = None, cache_size: int = 4096):
+        self.locations = locations
+        self._by_code: Dict[str, List[int]] = {}
+        self._by_city: Dict[str, List[int]] = {}
+
+        entries: List[Tuple[str, int, int]] = []  # (key, rank, location index)
+        for i, location in enumerate(locations):
+            self._by_code.setdefault(location.code.upper(), []).append(i)
+            self._by_city.setdefault(normalize(location.city), []).append(i)
+
+            entries.append((location.code.lower(), PREFIX, i))
+            for name in {normalize(location.city), normalize(location.name)}:
+                entries.append((name, PREFIX, i))
+                words = name.split()
+                entries.extend((" ".join(words[w:]), WORD_PREFIX, i) for w in range(1, len(words)))
+            entries.append((normalize(location.state), WORD_PREFIX, i))
+
+        for alias, city in (aliases or {}).items():
+            entries.extend((normalize(alias), PREFIX, i) for i in self._by_city.get(normalize(city), []))
+
+        entries = sorted(set(entries))
+        self._keys = [key for key, _, _ in entries]
+        self._entries = entries
+        # Distinct keys by first letter, for the fuzzy scan
+        self._by_initial: Dict[str, List[str]] = {}
+        for key in dict.fromkeys(self._keys):
+            self._by_initial.setdefault(key[0], []).append(key)
+
+        self._suggest_cached = lru_cache(maxsize=cache_size)(self._suggest)
+
+    @classmethod
+    def load(cls, path: str) -> "LocationIndex":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        locations = [Location(name=a.get("name", a["city"]), kind=AIRPORT, **{k: a[k] for k in ("code", "city", "state")})
+                     for a in data.get("airports", [])]
+        locations += [Location(kind=STATION, **s) for s in data.get("stations", [])]
+        return cls(locations, data.get("aliases"))
+
+    def __len__(self) -> int:
+        return len(self.locations)
+
+    def _prefix(self, query: str) -> List[Tuple[str, int, int]]:
+        lo = bisect_left(self._keys, query)
+        hi = bisect_left(self._keys, query + "\uffff", lo)
+        return self._entries[lo:hi]
+
+    def _fuzzy(self, query: str) -> List[Tuple[str, int, int]]:
+        # One typo in short queries, two in longer ones; the first letter is taken as typed
+        max_distance = 1 if len(query) <= 5 else 2
+        matches = []
+        for key in self._by_initial.get(query[0], []):
+            distance = prefix_distance(query, key, max_distance)
+            if distance <= max_distance:
+                matches.extend(self._prefix(key))
+        return matches
+
+    def _suggest(self, query: str, kind: Optional[str], limit: int) -> Tuple[Location, ...]:
+        best: Dict[int, int] = {}
+
+        def consider(i: int, rank: int) -> None:
+            if kind is None or self.locations[i].kind == kind:
+                best[i] = min(rank, best.get(i, rank))
+
+        for i in self._by_code.get(query.upper(), []):
+            consider(i, EXACT_CODE)
+        for key, rank, i in self._prefix(query):
+            consider(i, EXACT_NAME if key == query and rank == PREFIX else rank)
+        if len(best) < limit and len(query) >= MIN_FUZZY_LENGTH:
+            for _, _, i in self._fuzzy(query):
+                if i not in best:
+                    consider(i, FUZZY)
+
+        # Ties keep file order, which lists the busiest airports and stations first
+        ranked = sorted(best, key=lambda i: (best[i], i))
+        return tuple(self.locations[i] for i in ranked[:limit])
+
+    def suggest(self, text: str, kind: Optional[str] = None, limit: int = 10) -> Tuple[Location, ...]:
+        """Best matches for what a user has typed so far"""
+        query = normalize(text)
+        if not query:
+            return ()
+        return self._suggest_cached(query, kind, limit)
+
+    def in_city(self, city: str, kind: Optional[str] = None) -> Optional[Location]:
+        """The main airport or station of a city"""
+        for i in self._by_city.get(normalize(city), []):
+            if kind is None or self.locations[i].kind == kind:
+                return self.locations[i]
+        return None
+
+    def _exact(self, text: str) -> Optional[Location]:
+        """The location with exactly this code, or else exactly this city, station name or alias"""
+        codes = self._by_code.get(text.strip().upper())
+        if codes:
+            return self.locations[codes[0]]
+        query = normalize(text)
+        for key, rank, i in self._prefix(query):
+            if key == query and rank == PREFIX:
+                return self.locations[i]
+        return None
+
+    def _of_kind(self, location: Location, kind: Optional[str]) -> Optional[Location]:
+        if kind is None or location.kind == kind:
+            return location
+        return self.in_city(location.city, kind)
+
+    def _unambiguous_prefix(self, text: str) -> Optional[Location]:
+        """The first location whose keys start with `text`, if every such location is in one city"""
+        query = normalize(text)
+        if len(query) < MIN_RESOLVE_PREFIX_LENGTH:
+            return None
+        matches = sorted({i for _, _, i in self._prefix(query)})
+        if not matches or len({normalize(self.locations[i].city) for i in matches}) > 1:
+            return None
+        return self.locations[matches[0]]
+
+    def resolve(self, text: str, kind: Optional[str] = None) -> Optional[Location]:
+        """The location free text means, e.g. "Bengaluru, Karnataka (BLR)", "bangalore",
+        "bengal" or "SBC"; a code of the other kind maps through its city ("NDLS" -> DEL).
+
+        Only exact codes, names and aliases and prefixes that all point at one city
+        count. There is no typo tolerance here: places outside the index ("DXB",
+        "Madrid") resolve to None and reach the upstream unchanged rather than as the
+        nearest Indian city. suggest() is the fuzzy lookup, for autocomplete.
+        """
+        if not text or not text.strip():
+            return None
+        match = _CODE_IN_PARENS.search(text)
+        # "Dubai (DXB)" means DXB, whether or not we know it
+        candidates = [match.group(1)] if match else [text.strip(), text.split(",")[0].strip()]
+
+        for candidate in dict.fromkeys(candidates):
+            location = self._exact(candidate)
+            if location is None and not _CODE_LIKE.fullmatch(candidate):
+                location = self._unambiguous_prefix(candidate)
+            if location is None:
+                continue
+            if kind == AIRPORT and location.kind == STATION and len(candidate) == 3 \
+                    and location.code == candidate.upper():
+                # A three-letter code we only know as a station ("CDG") is more likely an unlisted airport
+                return None
+            return self._of_kind(location, kind)
+        return None
+
+
+location_index = LocationIndex.load(LOCATIONS_FILE)
+
+
+def _fallback_code(text: str) -> str:
+    match = _CODE_IN_PARENS.search(text)
+    return (match.group(1) if match else text).strip().upper()
+
+
+def airport_code(text: str) -> str:
+    """IATA code for free text, or the text itself (upper-cased) if nothing matches"""
+    location = location_index.resolve(text, AIRPORT)
+    return location.code if location else _fallback_code(text)
+
+
+def station_code(text: str) -> str:
+    """Railway station code for free text, or the text itself (upper-cased) if nothing matches"""
+    location = location_index.resolve(text, STATION)
+    return location.code if location else _fallback_code(text)
+
+
+def city_name(text: str, kind: Optional[str] = None) -> str:
+    """City for a code or free text ("GOI" -> "Goa"), or the text itself if nothing matches"""
+    location = location_index.resolve(text, kind)
+    return location.city if location else _CODE_IN_PARENS.sub("", text).strip()
+
+
+def codes_for(text: str) -> Tuple[str, str, str]:
+    """(airport code, station code, city) for free text from a single lookup, e.g. "Pune" -> ("PNQ", "PUNE", "Pune")"""
+    location = location_index.resolve(text)
+    if location is None:
+        fallback = _fallback_code(text)
+        return fallback, fallback, city_name(text)
+    airport = location if location.kind == AIRPORT else location_index.in_city(location.city, AIRPORT)
+    station = location if location.kind == STATION else location_index.in_city(location.city, STATION)
+    airport_code_ = airport.code if airport else location.code
+    if location.kind == STATION and location.code == _fallback_code(text) and len(location.code) == 3:
+        # As in resolve(): a bare three-letter station code is not taken to mean an airport
+        airport_code_ = location.code
+    return airport_code_, station.code if station else location.code, location.city
@@ -0,0 +1,205 @@
+"""In-process metrics with Prometheus text exposition.
+
+Histograms and counters cover plan steps, tool runs, upstream HTTP calls, LLM
+calls and caches. Every observation made while a request id is set (see
+`request_id_var`) is also recorded as a span for that request, so a single slow
+request can be broken down afterwards.
+"""
+import functools
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_key(labelnames: Sequence[str], labels: Dict[str, Any]) -> Tuple[str, ...]:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _escape_label_value(value: str) -> str:
+    """Backslash, double quote and newline escaped as the Prometheus text format requires"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> (per-bucket counts, sum, count)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float, int]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            if index < len(counts):
+                counts[index] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    le = 'le="%s"' % bound
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: "OrderedDict[str, Any]" = OrderedDict()
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "travel_agent_http_request_duration_seconds", "Latency of requests served by the API", ("method", "path", "status"))
+AGENT_RUN_DURATION = REGISTRY.histogram(
+    "travel_agent_run_duration_seconds", "Latency of whole travel planning agent runs", ("mode", "outcome"))
+STEP_DURATION = REGISTRY.histogram(
+    "travel_agent_step_duration_seconds", "Latency of individual plan steps", ("step", "outcome"))
+TOOL_DURATION = REGISTRY.histogram(
+    "travel_agent_tool_duration_seconds", "Latency of tool run() calls", ("tool", "outcome"))
+TOOL_CALLS = REGISTRY.counter(
+    "travel_agent_tool_calls_total", "Tool run() calls", ("tool", "outcome"))
+UPSTREAM_DURATION = REGISTRY.histogram(
+    "travel_agent_upstream_request_duration_seconds", "Latency of upstream HTTP calls", ("host", "method", "status"))
+UPSTREAM_ERRORS = REGISTRY.counter(
+    "travel_agent_upstream_errors_total", "Upstream HTTP calls that failed or returned 4xx/5xx", ("host", "reason"))
+UPSTREAM_REJECTED = REGISTRY.counter(
+    "travel_agent_upstream_rejected_total", "Upstream calls refused by the client-side rate limiter or circuit breaker",
+    ("upstream", "reason"))
+LLM_DURATION = REGISTRY.histogram(
+    "travel_agent_llm_call_duration_seconds", "Latency of LLM calls", ("model", "outcome"))
+LLM_TOKENS = REGISTRY.counter(
+    "travel_agent_llm_tokens_total", "LLM tokens used", ("model", "kind"))
+CACHE_LOOKUPS = REGISTRY.counter(
+    "travel_agent_cache_lookups_total", "Cache lookups by result", ("cache", "result"))
+
+
+# ---------------------------------------------------------------------------
+# Per-request spans
+# ---------------------------------------------------------------------------
+
+class TraceStore:
+    """Spans of the most recent requests, keyed by request id"""
+
+    def __init__(self, max_requests: int = 500):
+        self.max_requests = max_requests
+        self._traces: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, request_id: str, span: Dict[str, Any]) -> None:
+        with self._lock:
+            spans = self._traces.get(request_id)
+            if spans is None:
+                spans = self._traces[request_id] = []
+                while len(self._traces) > self.max_requests:
+                    self._traces.popitem(last=False)
+            spans.append(span)
+
+    def get(self, request_id: str) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            spans = self._traces.get(request_id)
+            return list(spans) if spans is not None else None
+
+
+TRACES = TraceStore()
+
+
+def record_span(name: str, duration: float, **attributes) -> None:
+    request_id = request_id_var.get()
+    if request_id:
+        TRACES.add(request_id, {"name": name, "duration_s": round(duration, 4), "end": time.time(), **attributes})
+
+
+@contextmanager
+def timed(histogram: Histogram, span: str, counter: Optional[Counter] = None, **labels):
+    """Observe the block's duration with an outcome label, and record it as a span"""
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        histogram.observe(duration, outcome=outcome, **labels)
+        if counter is not None:
+            counter.inc(outcome=outcome, **labels)
+        record_span(span, duration, outcome=outcome, **labels)
+
+
+def instrumented_tool(run):
+    """Decorator for Tool.run: times each call under the tool's id"""
+    @functools.wraps(run)
+    def wrapper(self, *args, **kwargs):
+        with timed(TOOL_DURATION, f"tool:{self.id}", TOOL_CALLS, tool=self.id):
+            return run(self, *args, **kwargs)
+    return wrapper
+
+
+def render_latest() -> str:
+    return REGISTRY.render()
@@ -1,10 +1,68 @@
+import contextvars
 import os
-from typing import ClassVar, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import ClassVar, Dict, List, Optional, Tuple
 
-from openai import api_key
 from pydantic import BaseModel, Field
-import requests
 from portia import Tool, ToolRunContext
+from portia.errors import ToolSoftError
+
+from tools import http_client, metrics
+from tools.image_store import proxy_path
+from tools.response_cache import ResponseCache, normalize_query
+
+
+# Search results barely change, so repeat queries are served from cache
+image_cache = ResponseCache(
+    namespace="pexels:photos",
+    ttl=float(os.getenv("PEXELS_CACHE_TTL", "86400")),
+    maxsize=int(os.getenv("PEXELS_CACHE_SIZE", "512")),
+    sqlite_path=os.getenv("PEXELS_CACHE_DB"),
+)
+
+# Photos per search; the batch tool asks for the same page so both share cache entries
+PEXELS_PER_PAGE = 3
+# Pexels rejects larger pages
+PEXELS_MAX_PER_PAGE = 80
+
+PEXELS_BATCH_MAX = int(os.getenv("PEXELS_BATCH_MAX", "12"))
+PEXELS_BATCH_WORKERS = int(os.getenv("PEXELS_BATCH_WORKERS", "4"))
+
+
+class ImageResult(BaseModel):
+    url: str
+    id: Optional[int] = None
+    photographer: Optional[str] = None
+    alt_text: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    # Same picture through this API's /images proxy; add ?w= for a thumbnail
+    proxy_url: Optional[str] = None
+
+
+def photo_to_image(photo: dict) -> Optional[ImageResult]:
+    src = photo.get("src", {})
+    url = src.get("medium")
+    if not url:
+        return None
+    return ImageResult(
+        url=url,
+        id=photo.get("id"),
+        photographer=photo.get("photographer"),
+        alt_text=photo.get("alt"),
+        width=photo.get("width"),
+        height=photo.get("height"),
+        # The proxy downloads a large rendition once and scales it down itself
+        proxy_url=proxy_path(src.get("large2x") or url),
+    )
+
+
+def render_images(images: List[ImageResult], query: str) -> str:
+    """Human-readable listing, only for places that need text"""
+    if not images:
+        return f"No images found for '{query}' on Pexels"
+    image_list = "\n".join([f"{i + 1}. {image.url}" for i, image in enumerate(images)])
+    return f"Found {len(images)} images for '{query}':\n{image_list}"
 
 
 class PexelsSearchInput(BaseModel):
@@ -16,26 +74,121 @@ class PexelsSearchTool(Tool):
     name: str = "Pexels Image Search"
     description: str = "Search and retrieve travel images from Pexels API using a search query"
     args_schema: type[BaseModel] = PexelsSearchInput
-    output_schema: ClassVar[Tuple[str, str]] = ("string", "Returns search results with image URLs from Pexels")
+    output_schema: ClassVar[Tuple[str, str]] = ("List[ImageResult]", "Images from Pexels with URL, photographer and size")
 
     # Define api_key as a Pydantic field
     api_key: str = Field(..., description="Pexels API key for authentication")
+    base_url: str = Field(
+        default_factory=lambda: os.getenv("PEXELS_BASE_URL", "https://api.pexels.com"),
+        description="Pexels API base URL"
+    )
+
+    def search_photos(self, query: str, per_page: int = PEXELS_PER_PAGE) -> list:
+        cache_key = f"{normalize_query(query)}|{per_page}"
+        photos = image_cache.get(cache_key)
+        if photos is not None:
+            return photos
 
-    def run(self, context: ToolRunContext, query: str) -> str:
         headers = {"Authorization": self.api_key}
-        url = f"https://api.pexels.com/v1/search?query={query}&per_page=3"
-        response = requests.get(url, headers=headers)
+        url = f"{self.base_url}/v1/search"
+        response = http_client.get(url, upstream="pexels", headers=headers, params={"query": query, "per_page": per_page})
         response.raise_for_status()
 
-        results = response.json()
-        photos = results.get('photos', [])
+        photos = response.json().get('photos', [])
+        image_cache.set(cache_key, photos)
+        return photos
+
+    def search_images(self, query: str, per_page: int = PEXELS_PER_PAGE) -> List[ImageResult]:
+        photos = self.search_photos(query, per_page)
+        return [image for image in map(photo_to_image, photos) if image is not None]
+
+    @metrics.instrumented_tool
+    def run(self, context: ToolRunContext, query: str) -> List[ImageResult]:
+        return self.search_images(query)
+
+
+class PexelsBatchSearchInput(BaseModel):
+    queries: List[str] = Field(
+        ..., description=f"Attraction or place names (at most {PEXELS_BATCH_MAX}), e.g. ['Gateway of India', 'Marine Drive']")
+    per_query: int = Field(PEXELS_PER_PAGE, description="Images wanted per name")
+
+
+class BatchImageResults(BaseModel):
+    images: Dict[str, List[ImageResult]] = {}
+    # Names that got no search (over the limit) or whose search failed, with the reason
+    errors: Dict[str, str] = {}
+
+
+class PexelsBatchSearchTool(PexelsSearchTool):
+    """Images for a whole list of attractions in one tool call.
+
+    The Pexels queries run concurrently (at most PEXELS_BATCH_WORKERS at a time) and
+    share the "pexels" rate limiter with every other Pexels call, so the key's
+    quota holds however many names are passed.
+    """
+
+    id: str = "pexels_batch_search"
+    name: str = "Pexels Batch Image Search"
+    description: str = ("Find images for several attractions or places in one call. Pass all the names at once "
+                        f"(at most {PEXELS_BATCH_MAX}); returns `images`, a map of each name to its images with no "
+                        "photo repeated across names, and `errors` for names that got no search or whose search failed")
+    args_schema: type[BaseModel] = PexelsBatchSearchInput
+    output_schema: ClassVar[Tuple[str, str]] = (
+        "BatchImageResults", "Images from Pexels per attraction name, each photo used at most once, plus per-name errors")
+
+    def search_many(self, queries: List[str], per_query: int = PEXELS_PER_PAGE) -> BatchImageResults:
+        per_query = max(1, min(per_query, PEXELS_MAX_PER_PAGE))
+        results = BatchImageResults()
+
+        # Names that differ only in case or spacing are one query
+        names: Dict[str, str] = {}
+        for query in queries:
+            if query.strip():
+                names.setdefault(normalize_query(query), query.strip())
+        for name in list(names.values())[PEXELS_BATCH_MAX:]:
+            results.errors[name] = f"Not searched: at most {PEXELS_BATCH_MAX} names per call"
+        names = dict(list(names.items())[:PEXELS_BATCH_MAX])
+        if not names:
+            return results
+
+        # Same page as single searches, so the two share cached results; deduplication
+        # below may leave a name with fewer than per_query photos
+        per_page = max(per_query, PEXELS_PER_PAGE)
+        with ThreadPoolExecutor(max_workers=min(PEXELS_BATCH_WORKERS, len(names))) as executor:
+            futures = {
+                key: executor.submit(contextvars.copy_context().run, self.search_images, name, per_page)
+                for key, name in names.items()
+            }
+            found, failures = {}, {}
+            for key, future in futures.items():
+                try:
+                    found[key] = future.result()
+                except Exception as e:
+                    found[key], failures[key] = [], e
+
+        if len(failures) == len(names):
+            raise ToolSoftError(f"Pexels image search failed: {next(iter(failures.values()))}")
+
+        seen = set()
+        for key, name in names.items():
+            if key in failures:
+                results.errors[name] = f"Pexels image search failed: {failures[key]}"
+                continue
+            unique = []
+            for image in found[key]:
+                photo_key = image.id or image.url
+                if photo_key in seen:
+                    continue
+                seen.add(photo_key)
+                unique.append(image)
+                if len(unique) == per_query:
+                    break
+            results.images[name] = unique
+        return results
 
-        if photos:
-            urls = [photo['src']['medium'] for photo in photos[:3]]
-            image_list = "\n".join([f"{i + 1}. {url}" for i, url in enumerate(urls)])
-            return f"Found {len(urls)} images for '{query}':\n{image_list}"
-        else:
-            return f"No images found for '{query}' on Pexels"
+    @metrics.instrumented_tool
+    def run(self, context: ToolRunContext, queries: List[str], per_query: int = PEXELS_PER_PAGE) -> BatchImageResults:
+        return self.search_many(queries, per_query)
 
 
 # #Testing code
@@ -48,4 +201,4 @@ class PexelsSearchTool(Tool):
 #
 # query = "give some images of Bengaluru where I can travel"
 # result = tool.run(context, query)
-# print(result)
\ No newline at end of file
+# print(render_images(result, query))
\ No newline at end of file
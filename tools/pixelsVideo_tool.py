@@ -1,9 +1,60 @@
 import os
-import requests
-from typing import ClassVar, Tuple
+from typing import ClassVar, List, Optional, Tuple
 from pydantic import BaseModel, Field
 from portia import Tool, ToolRunContext
 
+from tools import http_client, metrics
+from tools.image_store import proxy_path
+from tools.response_cache import ResponseCache, normalize_query
+
+
+video_cache = ResponseCache(
+    namespace="pexels:videos",
+    ttl=float(os.getenv("PEXELS_CACHE_TTL", "86400")),
+    maxsize=int(os.getenv("PEXELS_CACHE_SIZE", "512")),
+    sqlite_path=os.getenv("PEXELS_CACHE_DB"),
+)
+
+
+class VideoResult(BaseModel):
+    url: str
+    id: Optional[int] = None
+    quality: Optional[str] = None
+    poster_url: Optional[str] = None
+    poster_proxy_url: Optional[str] = None
+    duration: Optional[int] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    videographer: Optional[str] = None
+
+
+def video_to_result(video: dict) -> Optional[VideoResult]:
+    files = video.get("video_files", [])
+    # prefer HD file if available, otherwise fall back to the first file
+    chosen = next((f for f in files if f.get("quality") == "hd"), files[0] if files else None)
+    if not chosen or not chosen.get("link"):
+        return None
+    return VideoResult(
+        url=chosen["link"],
+        id=video.get("id"),
+        quality=chosen.get("quality"),
+        poster_url=video.get("image"),
+        poster_proxy_url=proxy_path(video.get("image")),
+        duration=video.get("duration"),
+        width=chosen.get("width"),
+        height=chosen.get("height"),
+        videographer=video.get("user", {}).get("name"),
+    )
+
+
+def render_videos(videos: List[VideoResult], query: str) -> str:
+    """Human-readable listing, only for places that need text"""
+    if not videos:
+        return f"No videos found for '{query}' on Pexels"
+    return f"Found {len(videos)} videos for '{query}':\n" + "\n".join(
+        f"{i}. {video.url}" for i, video in enumerate(videos, 1)
+    )
+
 
 class PexelsVideoSearchInput(BaseModel):
     query: str = Field(..., description="The search query for finding travel videos")
@@ -16,42 +67,36 @@ class PexelsVideoSearchTool(Tool):
 
     args_schema: type[BaseModel] = PexelsVideoSearchInput
     output_schema: ClassVar[Tuple[str, str]] = (
-        "string",
-        "Returns search results with video URLs from Pexels"
+        "List[VideoResult]",
+        "Videos from Pexels with URL, poster frame, duration and size"
     )
 
     # Declare the API key as a Pydantic field
     api_key: str = Field(..., description="Pexels API key for authentication")
+    base_url: str = Field(
+        default_factory=lambda: os.getenv("PEXELS_BASE_URL", "https://api.pexels.com"),
+        description="Pexels API base URL"
+    )
+
+    def search_videos(self, query: str, per_page: int = 5) -> list:
+        cache_key = f"{normalize_query(query)}|{per_page}"
+        videos = video_cache.get(cache_key)
+        if videos is not None:
+            return videos
 
-    def run(self, context: ToolRunContext, query: str) -> str:
         headers = {"Authorization": self.api_key}
-        url = f"https://api.pexels.com/videos/search?query={query}&per_page=5"
-        response = requests.get(url, headers=headers)
+        url = f"{self.base_url}/videos/search"
+        response = http_client.get(url, upstream="pexels", headers=headers, params={"query": query, "per_page": per_page})
         response.raise_for_status()
 
-        results = response.json()
-        videos = results.get("videos", [])
-
-        if not videos:
-            return f"No videos found for '{query}' on Pexels"
-
-        # Extract video URLs (HD or fallback)
-        video_list = []
-        for i, video in enumerate(videos[:5], 1):
-            # prefer HD file if available
-            files = video.get("video_files", [])
-            # find the first HD or fallback to first file
-            src = None
-            for f in files:
-                if f.get("quality") == "hd":
-                    src = f.get("link")
-                    break
-            if not src and files:
-                src = files[0].get("link")
-            if src:
-                video_list.append(f"{i}. {src}")
-
-        if not video_list:
-            return f"No valid video URLs found for '{query}'"
-
-        return f"Found {len(video_list)} videos for '{query}':\n" + "\n".join(video_list)
\ No newline at end of file
+        videos = response.json().get("videos", [])
+        video_cache.set(cache_key, videos)
+        return videos
+
+    def search_video_results(self, query: str, per_page: int = 5) -> List[VideoResult]:
+        videos = self.search_videos(query, per_page)
+        return [result for result in map(video_to_result, videos) if result is not None]
+
+    @metrics.instrumented_tool
+    def run(self, context: ToolRunContext, query: str) -> List[VideoResult]:
+        return self.search_video_results(query)
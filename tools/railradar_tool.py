@@ -1,14 +1,35 @@
 import os
-import requests
 from datetime import datetime
-from typing import List
+from typing import Any, Dict, List, Tuple
 from pydantic import BaseModel, Field, PrivateAttr
 from portia import Tool, ToolRunContext
 
+from tools import http_client, metrics
+from tools.locations import station_code
+from tools.response_cache import ResponseCache
+
+
+REVALIDATION_TTL = float(os.getenv("RAILRADAR_REVALIDATION_TTL", "21600"))
+AVAILABILITY_TTL = float(os.getenv("RAILRADAR_AVAILABILITY_TTL", "120"))
+CACHE_SIZE = int(os.getenv("RAILRADAR_CACHE_SIZE", "512"))
+
+# Seats and waiting lists change by the minute, so finished results are kept only briefly,
+# as the List[TrainInfo] itself so a repeat lookup builds no models at all.
+availability_cache = ResponseCache(namespace="railradar:availability", ttl=AVAILABILITY_TTL, maxsize=CACHE_SIZE)
+
+# Last payload seen per route with its ETag / Last-Modified (optionally in SQLite), to
+# revalidate once availability expires instead of downloading and parsing it again
+revalidation_cache = ResponseCache(
+    namespace="railradar:revalidation",
+    ttl=REVALIDATION_TTL,
+    maxsize=CACHE_SIZE,
+    sqlite_path=os.getenv("RAILRADAR_CACHE_DB"),
+)
+
 
 class RailRadarSearchParams(BaseModel):
-    origin: str = Field(..., description="Origin station code, e.g. 'NDLS'")
-    destination: str = Field(..., description="Destination station code, e.g. 'BCT'")
+    origin: str = Field(..., description="Origin station code or city name, e.g. 'NDLS' or 'Delhi'")
+    destination: str = Field(..., description="Destination station code or city name, e.g. 'BCT' or 'Mumbai'")
     journey_date: str = Field(..., description="Journey date in YYYY-MM-DD format")
 
 
@@ -29,6 +50,44 @@ class TrainInfo(BaseModel):
     coaches: List[TrainCoachInfo]
 
 
+def split_payload(trains_data: List[Dict[str, Any]]) -> Tuple[List[Dict[str, str]], Dict[str, List[Dict[str, Any]]]]:
+    """Split a trains/between payload into its timetable and per-train class availability"""
+    timetable, classes = [], {}
+    for t in trains_data:
+        number = str(t.get("number", ""))
+        timetable.append({
+            "number": number,
+            "name": t.get("name", ""),
+            "dep_time": t.get("dep_time", ""),
+            "arr_time": t.get("arr_time", ""),
+        })
+        classes[number] = [
+            {
+                "class_code": cls.get("code", ""),
+                "status": cls.get("status", ""),
+                "available_seats": int(cls.get("available", 0)),
+                "waiting_list": int(cls.get("wl", 0)),
+                "fare": str(cls.get("fare", "N/A")),
+                "confirmation_probability": str(cls.get("confirm_prob", "N/A")),
+            }
+            for cls in t.get("classes", [])
+        ]
+    return timetable, classes
+
+
+def build_trains(timetable: List[Dict[str, str]], classes: Dict[str, List[Dict[str, Any]]]) -> List[TrainInfo]:
+    return [
+        TrainInfo(
+            train_number=t["number"],
+            train_name=t["name"],
+            departure_time=t["dep_time"],
+            arrival_time=t["arr_time"],
+            coaches=[TrainCoachInfo(**coach) for coach in classes.get(t["number"], [])],
+        )
+        for t in timetable
+    ]
+
+
 class RailRadarSearchTool(Tool):
     """RailRadar.in search tool for Portia AI"""
 
@@ -44,48 +103,49 @@ class RailRadarSearchTool(Tool):
     def __init__(self):
         super().__init__()
         self._api_key = os.getenv("RAILRADAR_API_KEY", "")
+        if os.getenv("RAILRADAR_BASE_URL"):
+            self._base_url = f"{os.getenv('RAILRADAR_BASE_URL')}/api/v1/trains/between"
 
+    @metrics.instrumented_tool
     def run(self, context: ToolRunContext, origin: str, destination: str, journey_date: str) -> List[TrainInfo]:
         params = RailRadarSearchParams(origin=origin, destination=destination, journey_date=journey_date)
         date_api = datetime.strptime(params.journey_date, "%Y-%m-%d").strftime("%Y-%m-%d")  # keep YYYY-MM-DD
+        # City names and airport codes ("Pune", "PNQ") become station codes ("PUNE")
+        origin_code, destination_code = station_code(params.origin), station_code(params.destination)
+        key = f"{origin_code}|{destination_code}|{date_api}"
+
+        trains = availability_cache.get(key)
+        if trains is not None:
+            return trains
 
         query = {
-            "from": params.origin,
-            "to": params.destination,
+            "from": origin_code,
+            "to": destination_code,
             "date": date_api,
             "availability": "true",
             "coaches": "true",
         }
+        trains = self._fetch(key, query)
+        availability_cache.set(key, trains)
+        return trains
 
-        headers = {"x-api-key": self._api_key}
+    def _fetch(self, key: str, query: Dict[str, str]) -> List[TrainInfo]:
+        """Fetch the route, revalidating the last payload when RailRadar sent validators for it"""
+        previous = revalidation_cache.get(key)
 
-        resp = requests.get(self._base_url, params=query, headers=headers, timeout=10)
+        headers = {"x-api-key": self._api_key}
+        resp = http_client.get_conditional(self._base_url, previous, upstream="railradar",
+                                           params=query, headers=headers)
+        if resp.status_code == 304 and previous is not None:
+            # Unchanged upstream: no body to download or parse
+            return build_trains(previous["timetable"], previous["classes"])
         resp.raise_for_status()
 
-        trains_data = resp.json().get("trains", [])
-        results: List[TrainInfo] = []
-
-        for t in trains_data:
-            coaches: List[TrainCoachInfo] = []
-            for cls in t.get("classes", []):
-                coaches.append(TrainCoachInfo(
-                    class_code=cls.get("code", ""),
-                    status=cls.get("status", ""),
-                    available_seats=int(cls.get("available", 0)),
-                    waiting_list=int(cls.get("wl", 0)),
-                    fare=str(cls.get("fare", "N/A")),
-                    confirmation_probability=str(cls.get("confirm_prob", "N/A")),
-                ))
-
-            results.append(TrainInfo(
-                train_number=str(t.get("number", "")),
-                train_name=t.get("name", ""),
-                departure_time=t.get("dep_time", ""),
-                arrival_time=t.get("arr_time", ""),
-                coaches=coaches,
-            ))
-
-        return results
+        timetable, classes = split_payload(resp.json().get("trains", []))
+        validators = http_client.validators(resp)
+        if validators:
+            revalidation_cache.set(key, {**validators, "timetable": timetable, "classes": classes})
+        return build_trains(timetable, classes)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,230 @@
+"""Client-side rate limiting and circuit breaking per upstream API.
+
+Each upstream (Amadeus, Pexels, RailRadar) gets a token bucket sized to its quota
+and a circuit breaker over its recent calls. Once the failure ratio crosses the
+threshold the breaker opens and calls fail immediately with CircuitOpenError
+instead of each one waiting for a timeout; after `reset_timeout` a single probe
+is let through and its outcome closes or re-opens the breaker.
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+import requests
+
+from tools import metrics
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class UpstreamUnavailable(requests.RequestException):
+    """Base for calls refused on the client side before reaching the upstream"""
+
+    def __init__(self, upstream: str, message: str, retry_after: float):
+        super().__init__(message)
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    pass
+
+
+class RateLimitedError(UpstreamUnavailable):
+    pass
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """Take a token; return how long to wait for it, or None if that exceeds `max_wait`"""
+        with self._lock:
+            self._refill(time.monotonic())
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if wait > max_wait:
+                return None
+            # Going negative queues this caller behind earlier reservations
+            self._tokens -= 1
+            return wait
+
+    def available(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+
+class CircuitBreaker:
+    """Opens when at least `failure_ratio` of the last `window` calls failed"""
+
+    def __init__(self, failure_ratio: float = 0.5, window: int = 20, min_calls: int = 5,
+                 reset_timeout: float = 30):
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> Tuple[bool, float]:
+        """(allowed, seconds until the next probe)"""
+        with self._lock:
+            if self._state == CLOSED:
+                return True, 0.0
+            retry_after = self._opened_at + self.reset_timeout - time.monotonic()
+            if self._state == OPEN and retry_after <= 0:
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True, 0.0
+            return False, max(retry_after, 1.0)
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probing = False
+                if success:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._trip()
+                return
+
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_ratio:
+                self._trip()
+
+    def cancel_probe(self) -> None:
+        """Give back the probe slot of a call that never reached the upstream, staying half-open"""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probing = False
+
+    def _trip(self) -> None:
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+
+class UpstreamGuard:
+    def __init__(self, name: str, bucket: TokenBucket, breaker: CircuitBreaker, max_wait: float):
+        self.name = name
+        self.bucket = bucket
+        self.breaker = breaker
+        self.max_wait = max_wait
+        self._counters = {"allowed": 0, "rate_limited": 0, "short_circuited": 0, "failures": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def acquire(self) -> None:
+        """Wait for a rate-limit token and a closed (or probing) breaker, or raise"""
+        allowed, retry_after = self.breaker.before_call()
+        if not allowed:
+            self._count("short_circuited")
+            metrics.UPSTREAM_REJECTED.inc(upstream=self.name, reason="circuit_open")
+            raise CircuitOpenError(self.name, f"{self.name} is unavailable (circuit open), retry in {retry_after:.0f}s",
+                                   retry_after)
+
+        wait = self.bucket.reserve(self.max_wait)
+        if wait is None:
+            # A probe that never happened must not leave the breaker stuck half-open,
+            # nor count as a success
+            self.breaker.cancel_probe()
+            self._count("rate_limited")
+            metrics.UPSTREAM_REJECTED.inc(upstream=self.name, reason="rate_limited")
+            raise RateLimitedError(self.name, f"{self.name} client-side rate limit reached",
+                                   1 / self.bucket.rate)
+        if wait:
+            time.sleep(wait)
+        self._count("allowed")
+
+    def record(self, success: bool) -> None:
+        if not success:
+            self._count("failures")
+        self.breaker.record(success)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            counters = dict(self._counters)
+        return {
+            "state": self.breaker.state,
+            "tokens_available": round(self.bucket.available(), 2),
+            "rate_per_second": round(self.bucket.rate, 4),
+            **counters,
+        }
+
+
+def is_failure(status_code: int) -> bool:
+    """Statuses that say the upstream is struggling, as opposed to a bad request"""
+    return status_code == 429 or status_code >= 500
+
+
+# Quotas: Amadeus self-service allows 10 TPS in test, Pexels 200 requests an hour
+# (its image CDN, used by the /images proxy, isn't part of the API quota)
+DEFAULT_LIMITS = {
+    "amadeus": (10.0, 10.0),
+    "pexels": (200 / 3600, 200.0),
+    "pexels_images": (20.0, 40.0),
+    "railradar": (5.0, 10.0),
+}
+
+MAX_WAIT = float(os.getenv("UPSTREAM_RATE_LIMIT_MAX_WAIT", "2"))
+FAILURE_RATIO = float(os.getenv("CIRCUIT_FAILURE_RATIO", "0.5"))
+MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "5"))
+WINDOW = int(os.getenv("CIRCUIT_WINDOW", "20"))
+RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+
+_guards: Dict[str, UpstreamGuard] = {}
+_guards_lock = threading.Lock()
+
+
+def guard_for(upstream: str) -> UpstreamGuard:
+    """The shared guard for `upstream`; limits come from <UPSTREAM>_RATE_LIMIT / <UPSTREAM>_RATE_BURST"""
+    guard = _guards.get(upstream)
+    if guard is None:
+        with _guards_lock:
+            guard = _guards.get(upstream)
+            if guard is None:
+                rate, burst = DEFAULT_LIMITS.get(upstream, (10.0, 10.0))
+                rate = float(os.getenv(f"{upstream.upper()}_RATE_LIMIT", rate))
+                burst = float(os.getenv(f"{upstream.upper()}_RATE_BURST", burst))
+                guard = _guards[upstream] = UpstreamGuard(
+                    upstream,
+                    TokenBucket(rate, burst),
+                    CircuitBreaker(FAILURE_RATIO, WINDOW, MIN_CALLS, RESET_TIMEOUT),
+                    MAX_WAIT,
+                )
+    return guard
+
+
+def stats() -> Dict[str, Dict[str, object]]:
+    with _guards_lock:
+        guards = list(_guards.values())
+    return {guard.name: guard.stats() for guard in guards}
@@ -0,0 +1,158 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from tools import metrics
+
+
+def normalize_query(query: str) -> str:
+    """Lower-case and collapse whitespace so "Gateway of  India" == "gateway of india" """
+    return " ".join(query.lower().split())
+
+
+class TTLCache:
+    """In-process LRU cache whose entries expire after `ttl` seconds"""
+
+    def __init__(self, ttl: float, maxsize: int = 512):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache:
+    """Persistent JSON cache on the requests-cache schema (`responses` with `expires`)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value BLOB, expires INTEGER)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS expires_idx ON responses(expires)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared across threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=5)
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._connect().execute(
+            "SELECT value, expires FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires) VALUES (?, ?, ?)",
+                (key, json.dumps(value).encode("utf-8"), int(time.time() + ttl)),
+            )
+
+    def purge_expired(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses WHERE expires IS NOT NULL AND expires <= ?", (int(time.time()),))
+
+
+class ResponseCache:
+    """Two-tier response cache: an in-process LRU in front of an optional SQLite file"""
+
+    def __init__(self, namespace: str, ttl: float, maxsize: int = 512, sqlite_path: Optional[str] = None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.memory = TTLCache(ttl=ttl, maxsize=maxsize)
+        self.persistent = SQLiteCache(sqlite_path) if sqlite_path else None
+        self._counters = {"hits": 0, "persistent_hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+        metrics.CACHE_LOOKUPS.inc(cache=self.namespace, result=name)
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: str) -> Optional[Any]:
+        key = self._key(key)
+
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("hits")
+            return value
+
+        if self.persistent is not None:
+            try:
+                value = self.persistent.get(key)
+            except sqlite3.Error as e:
+                print(f"Persistent cache read failed: {e}")
+                value = None
+            if value is not None:
+                self._count("persistent_hits")
+                self.memory.set(key, value)
+                return value
+
+        self._count("misses")
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        key = self._key(key)
+        self.memory.set(key, value)
+        if self.persistent is not None:
+            try:
+                self.persistent.set(key, value, self.ttl)
+            except sqlite3.Error as e:
+                print(f"Persistent cache write failed: {e}")
+
+    def clear(self) -> None:
+        self.memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = sum(counters.values())
+        hit_count = counters["hits"] + counters["persistent_hits"]
+        return {
+            **counters,
+            "size": len(self.memory),
+            "hit_ratio": round(hit_count / lookups, 3) if lookups else 0.0,
+        }
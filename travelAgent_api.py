@@ -1,18 +1,29 @@
 import os
 import asyncio
-import json
+from collections import Counter
+from functools import partial
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel, Field
 
-from tools.pexels_tool import PexelsSearchTool
+from deadlines import RequestBudget
+from direct import run_direct_searches
+from llm_config import build_portia_config
+from parsing import coerce_model
+from agent_pool import PoolSaturated, agent_pool, pool_saturated_handler
+from observability import install_metrics
+from tools import metrics
+from tools.pexels_tool import PexelsBatchSearchTool, PexelsSearchTool
 from tools.amadeus_tool import AmadeusScheduleTool
-from portia import Config, LLMProvider, Portia, ToolRegistry, example_tool_registry
+from tools.locations import AIRPORT, city_name
+from portia import Portia, ToolRegistry, example_tool_registry
 
 load_dotenv()
 
 # --- FastAPI app setup ---
 app = FastAPI(title="Travel Planner API")
+app.add_exception_handler(PoolSaturated, pool_saturated_handler)
+install_metrics(app)
 from datetime import date
 
 class TripRequest(BaseModel):
@@ -34,27 +45,36 @@ class FlightOption(BaseModel):
 class TripResponse(BaseModel):
     overview: str
     attractions: list[Attraction]
-    flights: list[FlightOption]
-    images: list[dict]  # fallback, rarely used
+    flights: list[FlightOption] = []
+    images: list[dict] = []  # fallback, rarely used
 
 # --- Portia / Tools setup ---
-google_config = Config.from_default(
-    llm_provider=LLMProvider.GOOGLE,
-    default_model="google/gemini-2.5-flash",
-    google_api_key=os.getenv("GOOGLE_API_KEY")
-)
+google_config = build_portia_config()
 pexels_tool = PexelsSearchTool(api_key=os.getenv("PEXELS_API_KEY"))
+pexels_batch_tool = PexelsBatchSearchTool(api_key=os.getenv("PEXELS_API_KEY"))
 flight_tool = AmadeusScheduleTool(
     api_key=os.getenv("AMADEUS_API_KEY"),
     api_secret=os.getenv("AMADEUS_API_SECRET")
 )
-custom_registry = ToolRegistry([pexels_tool, flight_tool])
+custom_registry = ToolRegistry([pexels_tool, pexels_batch_tool, flight_tool])
 portia = Portia(config=google_config, tools=example_tool_registry + custom_registry)
 
+# How each /plan-trip answer was turned into a TripResponse
+parse_path_counts = Counter()
+PARSE_PATHS = metrics.REGISTRY.counter(
+    "travel_agent_plan_trip_parse_paths_total", "How /plan-trip answers were parsed", ("path",))
+
+
+def count_parse_path(path: str) -> None:
+    parse_path_counts[path] += 1
+    PARSE_PATHS.inc(path=path)
+
 # --- Helper to run Portia query asynchronously ---
-async def run_portia_query(prompt: str) -> str:
-    loop = asyncio.get_event_loop()
-    result = await loop.run_in_executor(None, portia.run, prompt)
+async def run_portia_query(prompt: str, structured_output_schema=None):
+    """Return the final output value - a model instance when a schema is given"""
+    run = partial(portia.run, prompt, structured_output_schema=structured_output_schema)
+    with metrics.timed(metrics.STEP_DURATION, "step:agent_query", step="agent_query"):
+        result = await agent_pool.run(run)
     return result.outputs.final_output.value
 
 def build_prompt(req: TripRequest) -> str:
@@ -66,8 +86,23 @@ def build_prompt(req: TripRequest) -> str:
         f"{req.destination}, explaining the significance and reasons why each is recommended for holiday travelers.\n\n"
         "3. **Flight Search**: Using AmadeusScheduleTool, search for flights from "
         f"{req.source} to {req.destination} for the journey date {req.journey_date} and show options with timings and estimated fares.\n\n"
-        "4. **Images**: Fetch images of the recommended attractions and places to visit in "
-        f"{req.destination} using PexelsSearchTool for a visual reference."
+        "4. **Images**: Call PexelsBatchSearchTool once with the names of all the recommended "
+        f"attractions and places to visit in {req.destination}, and use the first image listed "
+        "for each name in its `images` map as that attraction's `image_url`.\n\n"
+        "Return the guide as JSON with `overview`, `attractions` (name, significance, image_url) "
+        "and `flights` (flight_no, departure, arrival, price)."
+    )
+
+def build_overview_prompt(req: TripRequest) -> str:
+    """Prompt for direct mode: flights and images are fetched without the agent"""
+    return (
+        f"Give me a travel guide for {req.destination} covering the following:\n\n"
+        "1. **Destination Overview**: Provide in-depth information about "
+        f"{req.destination}, including its significance, tourist appeal, and the current live weather conditions.\n\n"
+        "2. **Places to Visit**: List the top places to visit in "
+        f"{req.destination}, explaining the significance and reasons why each is recommended for holiday travelers.\n\n"
+        "Do not search for flights or images. Return the guide as JSON with `overview` and "
+        "`attractions` (name, significance)."
     )
 
 def parse_flights(text: str) -> list[FlightOption]:
@@ -117,34 +152,84 @@ def parse_attractions_and_images(text: str) -> list[Attraction]:
                     attr.image_url = url
     return attractions
 
-@app.post("/plan-trip", response_model=TripResponse)
-async def plan_trip(req: TripRequest):
-    raw = await run_portia_query(build_prompt(req))
+def parse_markdown(raw: str) -> TripResponse:
+    """Split-and-parse the markdown answer the agent gives without a schema"""
+    overview = raw.split("###")[1].split("\n",1)[1].split("\n###")[0].strip()
+    attractions = parse_attractions_and_images(raw)
+    flights = parse_flights(raw)
+    return TripResponse(
+        overview=overview,
+        attractions=attractions,
+        flights=flights,
+        images=[]
+    )
+
+async def run_trip_agent(prompt: str) -> TripResponse:
+    # One schema-constrained run; the output is normally a TripResponse already
+    output = await run_portia_query(prompt, structured_output_schema=TripResponse)
+    if isinstance(output, TripResponse):
+        count_parse_path("structured")
+        return output
 
+    # Cheap local repair: fence stripping and tolerant JSON parsing
+    trip = coerce_model(output, TripResponse)
+    if trip is not None:
+        count_parse_path("local_repair")
+        return trip
+
+    raw = str(output)
     try:
-        # Option A: split-and-parse
-        overview = raw.split("###")[1].split("\n",1)[1].split("\n###")[0].strip()
-        attractions = parse_attractions_and_images(raw)
-        flights = parse_flights(raw)
-        return TripResponse(
-            overview=overview,
-            attractions=attractions,
-            flights=flights,
-            images=[]
-        )
+        trip = parse_markdown(raw)
+        count_parse_path("markdown")
+        return trip
     except Exception:
-        # Option B: fallback LLM JSON extraction
-        json_prompt = (
-            "Extract the following JSON from the text below:\n"
-            "{overview, attractions:[{name, significance, image_url}], flights:[{flight_no, departure, arrival, price}]}\n\n"
-            f"Text:\n{raw}"
+        pass
+
+    # Last resort: a second, schema-constrained LLM pass over the text
+    json_prompt = (
+        "Extract the following JSON from the text below:\n"
+        "{overview, attractions:[{name, significance, image_url}], flights:[{flight_no, departure, arrival, price}]}\n\n"
+        f"Text:\n{raw}"
+    )
+    trip = coerce_model(await run_portia_query(json_prompt, structured_output_schema=TripResponse), TripResponse)
+    if trip is not None:
+        count_parse_path("llm_fallback")
+        return trip
+
+    count_parse_path("failed")
+    raise HTTPException(status_code=502, detail="Failed to parse response as JSON")
+
+
+@app.post("/plan-trip", response_model=TripResponse)
+async def plan_trip(req: TripRequest, direct: bool = False):
+    """`direct=true` fetches flights and images straight from the tools, skipping the LLM for them"""
+    if not direct:
+        return await run_trip_agent(build_prompt(req))
+
+    # On the bounded agent pool like the agent run itself, each search under its tool deadline
+    searches = agent_pool.run(
+        run_direct_searches, flight_tool, pexels_tool,
+        req.source, req.destination, req.journey_date.isoformat(), city_name(req.destination, AIRPORT), RequestBudget(),
+    )
+    trip, (flights, images) = await asyncio.gather(run_trip_agent(build_overview_prompt(req)), searches)
+
+    trip.flights = [
+        FlightOption(
+            flight_no=f.flight_number or "",
+            departure=f.departure_time or "",
+            arrival=f.arrival_time or "",
+            price=" ".join(filter(None, [f.price, f.currency])),
         )
-        json_text = await run_portia_query(json_prompt)
-        try:
-            data = json.loads(json_text)
-            return TripResponse(**data)
-        except Exception as e:
-            raise HTTPException(status_code=502, detail="Failed to parse response as JSON")
+        for f in flights.flights
+    ]
+    trip.images = [image.model_dump() for image in images.images]
+    return trip
+
+
+@app.get("/plan-trip/stats")
+async def plan_trip_stats():
+    """How often each parsing path ran"""
+    return {"parse_paths": dict(parse_path_counts)}
 
 # To run:
 # uvicorn travelAgent_api:app --reload